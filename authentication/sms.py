@@ -0,0 +1,132 @@
+"""
+SMS delivery.
+
+``get_sms_provider()`` returns one provider per worker process, chosen by
+``settings.SMS_PROVIDER`` (a dotted path). When unset, Eskiz is used if
+``SMS_EMAIL`` is configured and the stub otherwise.
+
+``EskizProvider`` sends through a pooled ``requests.Session``. The Eskiz
+auth token is kept in the shared cache, so workers log in once per token
+lifetime instead of once per message. A 401 triggers one refresh and a
+retry.
+"""
+import logging
+import threading
+import time
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class SMSError(Exception):
+    pass
+
+
+class BaseSMSProvider:
+    def send(self, phone, message):
+        raise NotImplementedError
+
+
+class StubSMSProvider(BaseSMSProvider):
+    """
+    Records messages in ``outbox`` instead of sending them, optionally after
+    ``SMS_STUB_LATENCY`` seconds to mimic a real provider in benchmarks.
+    """
+
+    def __init__(self):
+        self.outbox = []
+        self.latency = getattr(settings, 'SMS_STUB_LATENCY', 0)
+
+    def send(self, phone, message):
+        if self.latency:
+            time.sleep(self.latency)
+        self.outbox.append((phone, message))
+        logger.info(f"Stub SMS to {phone}: {message}")
+
+
+class EskizProvider(BaseSMSProvider):
+    token_cache_key = 'sms:eskiz:token'
+
+    def __init__(self):
+        self.base_url = settings.SMS_BASE_URL.rstrip('/')
+        self.timeout = settings.SMS_TIMEOUT
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        # Session objects are not thread-safe; each thread keeps its own pool
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.SMS_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._local.session = session
+        return session
+
+    def login(self):
+        response = self.session.post(
+            f'{self.base_url}/auth/login',
+            data={'email': settings.SMS_EMAIL, 'password': settings.SMS_PASSWORD},
+            timeout=self.timeout,
+        )
+        if response.status_code != 200:
+            raise SMSError(f"Eskiz login failed: HTTP {response.status_code}")
+        token = response.json().get('data', {}).get('token')
+        if not token:
+            raise SMSError("Eskiz login returned no token")
+        cache.set(self.token_cache_key, token, settings.SMS_TOKEN_TTL)
+        return token
+
+    def get_token(self, expired=None):
+        """
+        The cached token, logging in when there is none or when the cached
+        one is ``expired``. A worker that finds a token different from the
+        one that just failed reuses it instead of logging in again.
+        """
+        token = cache.get(self.token_cache_key)
+        if token and token != expired:
+            return token
+        return self.login()
+
+    def post_message(self, token, phone, message):
+        return self.session.post(
+            f'{self.base_url}/message/sms/send',
+            headers={'Authorization': f'Bearer {token}'},
+            json={'mobile_phone': phone.lstrip('+'), 'message': message, 'from': settings.SMS_SENDER},
+            timeout=self.timeout,
+        )
+
+    def send(self, phone, message):
+        token = self.get_token()
+        response = self.post_message(token, phone, message)
+        if response.status_code == 401:
+            response = self.post_message(self.get_token(expired=token), phone, message)
+        if response.status_code != 200:
+            raise SMSError(f"Eskiz send failed: HTTP {response.status_code} {response.text[:200]}")
+        logger.info(f"SMS sent successfully to {phone}")
+
+
+_provider = None
+
+
+def get_sms_provider():
+    global _provider
+    if _provider is None:
+        path = getattr(settings, 'SMS_PROVIDER', '')
+        if path:
+            provider_class = import_string(path)
+        elif settings.SMS_EMAIL:
+            provider_class = EskizProvider
+        else:
+            provider_class = StubSMSProvider
+        _provider = provider_class()
+    return _provider
+
+
+def send_sms(phone, message):
+    get_sms_provider().send(phone, message)
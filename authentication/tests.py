@@ -1,3 +1,92 @@
-from django.test import TestCase
+import json
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from . import sms
+from .sms import EskizProvider, SMSError, StubSMSProvider
+from .utils import send_sms_code
 
-# Create your tests here.
+
+class FakeEskizAdapter(BaseAdapter):
+    """Answers Eskiz requests in-process; ``valid_token`` is what the API accepts."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+        self.logins = 0
+        self.valid_token = None
+        self.send_status = 200
+
+    def send(self, request, **kwargs):
+        path = request.path_url
+        self.calls.append(path)
+        if path.endswith('/auth/login'):
+            self.logins += 1
+            self.valid_token = f'token-{self.logins}'
+            return self.respond(request, 200, {'data': {'token': self.valid_token}})
+        if request.headers.get('Authorization') != f'Bearer {self.valid_token}':
+            return self.respond(request, 401, {'message': 'Expired'})
+        return self.respond(request, self.send_status, {'status': 'waiting'})
+
+    def respond(self, request, status_code, body):
+        response = Response()
+        response.status_code = status_code
+        response._content = json.dumps(body).encode()
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+@override_settings(SMS_EMAIL='shop@example.com', SMS_PASSWORD='secret', SMS_BASE_URL='https://sms.test/api')
+class EskizProviderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.adapter = FakeEskizAdapter()
+
+    def make_provider(self):
+        provider = EskizProvider()
+        provider.session.mount('https://sms.test', self.adapter)
+        return provider
+
+    def test_token_is_shared_between_providers(self):
+        self.make_provider().send('+998901234567', 'one')
+        self.make_provider().send('+998901234567', 'two')
+
+        self.assertEqual(self.adapter.logins, 1)
+        self.assertEqual(self.adapter.calls.count('/api/message/sms/send'), 2)
+
+    def test_expired_token_is_refreshed_once(self):
+        provider = self.make_provider()
+        provider.send('+998901234567', 'one')
+        self.adapter.valid_token = 'rotated'  # the API revoked the cached token
+
+        self.adapter.calls.clear()
+        provider.send('+998901234567', 'two')
+
+        self.assertEqual(self.adapter.calls, [
+            '/api/message/sms/send', '/api/auth/login', '/api/message/sms/send'
+        ])
+        self.assertEqual(cache.get(EskizProvider.token_cache_key), 'token-2')
+
+    def test_failed_send_raises(self):
+        provider = self.make_provider()
+        self.adapter.send_status = 500
+        with self.assertRaises(SMSError):
+            provider.send('+998901234567', 'one')
+
+
+@override_settings(SMS_PROVIDER='authentication.sms.StubSMSProvider')
+class StubProviderTests(TestCase):
+    def test_send_sms_code_records_message(self):
+        sms._provider = None
+        try:
+            self.assertTrue(send_sms_code('+998901234567', 'Your code is 123456'))
+            provider = sms.get_sms_provider()
+            self.assertIsInstance(provider, StubSMSProvider)
+            self.assertEqual(provider.outbox, [('+998901234567', 'Your code is 123456')])
+        finally:
+            sms._provider = None
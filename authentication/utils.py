@@ -1,7 +1,8 @@
 import random
 import string
-from django.conf import settings
 import logging
+import requests
+from .sms import SMSError, send_sms
 
 logger = logging.getLogger(__name__)
 
@@ -13,94 +14,13 @@ def generate_verification_code(length=6):
 
 def send_sms_code(phone, message):
     """
-    Send SMS using SMS service provider
-    This is a generic implementation - you need to integrate with actual SMS provider
+    Send SMS synchronously through the configured provider (authentication.sms).
+    Returns False instead of raising when delivery fails.
     """
     try:
-        # Example integration with Twilio
-        if hasattr(settings, 'TWILIO_ACCOUNT_SID'):
-            from twilio.rest import Client
-
-            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-
-            message = client.messages.create(
-                body=message,
-                from_=settings.TWILIO_PHONE_NUMBER,
-                to=phone
-            )
-
-            logger.info(f"SMS sent successfully to {phone}. SID: {message.sid}")
-            return True
-
-        # Example integration with custom SMS API
-        elif hasattr(settings, 'SMS_API_URL'):
-            payload = {
-                'phone': phone,
-                'message': message,
-                'api_key': settings.SMS_API_KEY
-            }
-
-            response = requests.post(
-                settings.SMS_API_URL,
-                json=payload,
-                timeout=30
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                if result.get('success'):
-                    logger.info(f"SMS sent successfully to {phone}")
-                    return True
-                else:
-                    logger.error(f"SMS API error: {result.get('message', 'Unknown error')}")
-                    return False
-            else:
-                logger.error(f"SMS API HTTP error: {response.status_code}")
-                return False
-
-        # Example integration with Eskiz.uz (Uzbekistan SMS provider)
-        elif hasattr(settings, 'ESKIZ_EMAIL'):
-            # First, get token
-            auth_response = requests.post(
-                'https://notify.eskiz.uz/api/auth/login',
-                data={
-                    'email': settings.ESKIZ_EMAIL,
-                    'password': settings.ESKIZ_PASSWORD
-                }
-            )
-
-            if auth_response.status_code == 200:
-                auth_data = auth_response.json()
-                token = auth_data['data']['token']
-
-                # Send SMS
-                sms_response = requests.post(
-                    'https://notify.eskiz.uz/api/message/sms/send',
-                    headers={'Authorization': f'Bearer {token}'},
-                    data={
-                        'mobile_phone': phone,
-                        'message': message,
-                        'from': '4546'  # Eskiz default sender
-                    }
-                )
-
-                if sms_response.status_code == 200:
-                    logger.info(f"SMS sent successfully to {phone} via Eskiz")
-                    return True
-                else:
-                    logger.error(f"Eskiz SMS error: {sms_response.text}")
-                    return False
-            else:
-                logger.error(f"Eskiz auth error: {auth_response.text}")
-                return False
-
-        # Development mode - just log the message
-        else:
-            logger.info(f"Development mode - SMS to {phone}: {message}")
-            print(f"SMS to {phone}: {message}")  # For development
-            return True
-
-    except Exception as e:
+        send_sms(phone, message)
+        return True
+    except (SMSError, requests.exceptions.RequestException) as e:
         logger.error(f"SMS sending failed: {str(e)}")
         return False
 
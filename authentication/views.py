@@ -10,6 +10,7 @@ from django.core.cache import cache
 from django.conf import settings
 from .utils import send_sms_code, generate_verification_code
 from .tasks import send_sms_task
+from cart.guest import merge_guest_cart
 import random
 import string
 
@@ -151,6 +152,8 @@ def verify_code(request):
             name=name
         )
 
+    merge_guest_cart(request, user)
+
     # Generate JWT tokens
     refresh = RefreshToken.for_user(user)
     access_token = refresh.access_token
@@ -186,6 +189,7 @@ def login(request):
         user = user_profile.user
 
         if user.check_password(password):
+            merge_guest_cart(request, user)
             refresh = RefreshToken.for_user(user)
             access_token = refresh.access_token
 
@@ -0,0 +1,80 @@
+"""
+Guest carts for anonymous shoppers.
+
+A guest is identified by a random id signed with ``TimestampSigner``. The
+token is returned on every guest cart response, both in the
+``X-Cart-Token`` header and in a ``cart_token`` cookie, and is read back
+from either. Re-signing on each response keeps active carts from
+expiring. When the guest signs in, ``merge_guest_cart`` folds the cart
+into the user's one with a single bulk write.
+"""
+import logging
+import uuid
+from django.conf import settings
+from django.core import signing
+from .services import unavailable_products
+from .storage import CartBusy, GuestCartStorage, get_cart_storage
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = 'X-Cart-Token'
+TOKEN_COOKIE = 'cart_token'
+TOKEN_SALT = 'cart.guest'
+
+guest_storage = GuestCartStorage()
+
+
+def read_guest_id(request):
+    """The guest id from a valid token on the request, or None."""
+    token = request.headers.get(TOKEN_HEADER) or request.COOKIES.get(TOKEN_COOKIE)
+    if not token:
+        return None
+    try:
+        return signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            token, max_age=settings.GUEST_CART_TIMEOUT
+        )
+    except signing.BadSignature:
+        return None
+
+
+def get_guest_id(request):
+    """The request's guest id, issuing a new one when it carries none."""
+    return read_guest_id(request) or uuid.uuid4().hex
+
+
+def attach_guest_token(response, guest_id):
+    token = signing.TimestampSigner(salt=TOKEN_SALT).sign(guest_id)
+    response[TOKEN_HEADER] = token
+    response.set_cookie(
+        TOKEN_COOKIE, token, max_age=settings.GUEST_CART_TIMEOUT,
+        httponly=True, samesite='Lax', secure=not settings.DEBUG,
+    )
+    return response
+
+
+def merge_guest_cart(request, user):
+    """
+    Add the request's guest cart to ``user``'s cart and drop it. Products
+    that can no longer be bought are left out.
+    """
+    guest_id = read_guest_id(request)
+    if guest_id is None:
+        return
+    items = guest_storage.load(guest_id)['items']
+    if not items:
+        return
+
+    operations = [
+        {'product_id': product_id, 'quantity': quantity, 'op': 'add'}
+        for product_id, quantity in items.items()
+    ]
+    unavailable = set(unavailable_products(operations))
+    operations = [op for op in operations if op['product_id'] not in unavailable]
+    if operations:
+        try:
+            get_cart_storage().apply(user, operations)
+        except CartBusy:
+            # Keep the guest cart; the next sign-in merges it
+            logger.warning(f"Guest cart {guest_id} not merged: cart of user {user.pk} is locked")
+            return
+    guest_storage.clear(guest_id)
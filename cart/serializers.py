@@ -14,6 +14,13 @@ class AddToCartSerializer(serializers.Serializer):
     product_id = serializers.IntegerField()
     quantity = serializers.IntegerField(min_value=1)
 
+class CartOperationSerializer(serializers.Serializer):
+    OPERATIONS = ('set', 'add', 'remove')
+
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, default=1)
+    op = serializers.ChoiceField(choices=OPERATIONS, default='add')
+
 class CartSerializer(serializers.Serializer):
     items = CartItemSerializer(many=True, read_only=True)
     total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
@@ -0,0 +1,208 @@
+from decimal import Decimal
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Sum, Window
+from django.utils import timezone
+from config.conditional import Validators
+from products.models import Product, thumbnail_prefetch
+from .models import CartItem
+
+
+def get_cart(user):
+    """
+    Load a user's cart for rendering with CartSerializer.
+
+    Items, their products, categories and thumbnails come from two queries;
+    the total is computed by the database as a window over the same rows.
+    """
+    line_total = ExpressionWrapper(
+        F('product__price') * F('quantity'),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+    items = list(
+        CartItem.objects.filter(user=user)
+        .select_related('product__category')
+        .prefetch_related(thumbnail_prefetch('product__images'))
+        .annotate(cart_total=Window(Sum(line_total)))
+        .order_by('created_at', 'id')
+    )
+    return {
+        'items': items,
+        'total': items[0].cart_total if items else Decimal('0.00'),
+        'items_count': len(items),
+    }
+
+
+def cart_validators(user):
+    """
+    ETag for a user's cart from one aggregate query.
+
+    There is no Last-Modified: the newest timestamp over the remaining
+    items does not move when a line is removed, so If-Modified-Since alone
+    would keep serving a cart that still shows it.
+    """
+    state = CartItem.objects.filter(user=user).aggregate(
+        count=Count('id'),
+        quantity=Sum('quantity'),
+        updated_at=Max('updated_at'),
+        products_updated_at=Max('product__updated_at'),
+    )
+    return Validators(
+        'cart', user.pk, state['count'], state['quantity'],
+        state['updated_at'], state['products_updated_at'],
+    )
+
+
+def add_to_cart(user, product_id, quantity):
+    """
+    Atomically add ``quantity`` of a product to the user's cart.
+
+    Uses a single ``INSERT ... ON CONFLICT DO UPDATE SET quantity =
+    quantity + excluded.quantity`` where the database supports it, so
+    concurrent adds from the same user can neither lose increments nor trip
+    the (user, product) unique constraint.
+    """
+    if connection.features.supports_update_conflicts_with_target:
+        _upsert_increment(user.pk, product_id, quantity)
+    else:
+        _increment_or_create(user, product_id, quantity)
+
+
+def _upsert_increment(user_id, product_id, quantity):
+    meta = CartItem._meta
+    qn = connection.ops.quote_name
+    table = qn(meta.db_table)
+    user_column = qn(meta.get_field('user').column)
+    product_column = qn(meta.get_field('product').column)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({user_column}, {product_column}, quantity, created_at, updated_at) "
+            f"VALUES (%s, %s, %s, %s, %s) "
+            f"ON CONFLICT ({user_column}, {product_column}) DO UPDATE SET "
+            f"quantity = {table}.quantity + EXCLUDED.quantity, updated_at = EXCLUDED.updated_at",
+            [user_id, product_id, quantity, now, now],
+        )
+
+
+def _increment_or_create(user, product_id, quantity):
+    items = CartItem.objects.filter(user=user, product_id=product_id)
+    if items.update(quantity=F('quantity') + quantity, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            CartItem.objects.create(user=user, product_id=product_id, quantity=quantity)
+    except IntegrityError:
+        # Another request inserted the row first; increment theirs instead
+        items.update(quantity=F('quantity') + quantity, updated_at=timezone.now())
+
+
+def unavailable_products(operations):
+    """Ids that set/add operations reference but cannot be bought (one query)."""
+    wanted = {
+        op['product_id'] for op in operations
+        if op['op'] != 'remove' and op['quantity'] > 0
+    }
+    if not wanted:
+        return []
+    available = set(
+        Product.objects.filter(pk__in=wanted, in_stock=True).values_list('pk', flat=True)
+    )
+    return sorted(wanted - available)
+
+
+def fold_operations(current, operations):
+    """
+    Resulting ``{product_id: quantity}`` after applying operations in order
+    to ``current``; removed products are left in with a quantity of 0.
+    """
+    quantities = dict(current)
+    for op in operations:
+        product_id = op['product_id']
+        if op['op'] == 'remove':
+            quantities[product_id] = 0
+        elif op['op'] == 'set':
+            quantities[product_id] = op['quantity']
+        else:
+            quantities[product_id] = quantities.get(product_id, 0) + op['quantity']
+    return quantities
+
+
+def apply_cart_operations(user, operations):
+    """
+    Apply ``{product_id, quantity, op}`` operations in order, in one
+    transaction: the touched rows are read once, then written with a single
+    bulk upsert on (user, product) and a single delete.
+    """
+    product_ids = {op['product_id'] for op in operations}
+    with transaction.atomic():
+        current = dict(
+            CartItem.objects.select_for_update()
+            .filter(user=user, product_id__in=product_ids)
+            .values_list('product_id', 'quantity')
+        )
+        quantities = fold_operations(current, operations)
+
+        upserts = [
+            CartItem(user=user, product_id=product_id, quantity=quantity)
+            for product_id, quantity in quantities.items()
+            if quantity > 0 and quantity != current.get(product_id)
+        ]
+        removals = [
+            product_id for product_id, quantity in quantities.items()
+            if quantity <= 0 and product_id in current
+        ]
+
+        if upserts:
+            CartItem.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=['user', 'product'],
+                update_fields=['quantity', 'updated_at'],
+            )
+        if removals:
+            CartItem.objects.filter(user=user, product_id__in=removals).delete()
+
+
+def remove_from_cart(user, product_id):
+    """Delete one line; returns False when the product was not in the cart."""
+    deleted, _ = CartItem.objects.filter(user=user, product_id=product_id).delete()
+    return bool(deleted)
+
+
+def clear_cart(user):
+    CartItem.objects.filter(user=user).delete()
+
+
+def cart_quantities(user_id):
+    """``{product_id: quantity}`` for a user's cart, oldest line first."""
+    return dict(
+        CartItem.objects.filter(user_id=user_id)
+        .order_by('created_at', 'id')
+        .values_list('product_id', 'quantity')
+    )
+
+
+def replace_cart(user_id, quantities):
+    """
+    Make a user's ``CartItem`` rows match ``quantities`` exactly, with one
+    bulk upsert and one delete. Products deleted in the meantime are
+    skipped.
+    """
+    existing = set(Product.objects.filter(pk__in=quantities).values_list('pk', flat=True))
+    rows = [
+        CartItem(user_id=user_id, product_id=product_id, quantity=quantity)
+        for product_id, quantity in quantities.items()
+        if quantity > 0 and product_id in existing
+    ]
+    with transaction.atomic():
+        CartItem.objects.filter(user_id=user_id).exclude(
+            product_id__in=[row.product_id for row in rows]
+        ).delete()
+        if rows:
+            CartItem.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['user', 'product'],
+                update_fields=['quantity', 'updated_at'],
+            )
@@ -0,0 +1,247 @@
+"""
+Cart storage engines.
+
+Views talk to the engine named by ``settings.CART_STORAGE_BACKEND``:
+
+* ``DatabaseCartStorage`` (default) reads and writes ``CartItem`` rows
+  directly.
+* ``CacheCartStorage`` keeps each cart in the shared cache and writes it
+  back to ``CartItem`` behind the request: the first change schedules a
+  ``flush_cart`` task ``CART_FLUSH_DELAY`` seconds out and every change
+  made until it runs is persisted by that single flush. Checkout flushes
+  synchronously, so orders are always built from the database.
+* ``GuestCartStorage`` holds anonymous carts in the cache only, keyed by
+  the id carried in a signed guest token (see ``cart.guest``).
+
+The cache entries never expire, but the cache must not evict them either
+(use a Redis ``maxmemory-policy`` of ``noeviction`` or ``volatile-*``);
+an evicted cart loses the changes made since its last flush.
+
+Read-modify-write cycles hold a per-cart lock in the cache. A worker that
+cannot get it within ``lock_timeout`` seconds raises ``CartBusy`` rather
+than going ahead unlocked.
+"""
+import secrets
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.utils.module_loading import import_string
+from config.conditional import Validators
+from products.cache import list_version
+from products.models import Product
+from .models import CartItem
+from . import services
+
+# Delete the lock only while it still holds our token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class CartBusy(Exception):
+    """The cart lock could not be acquired in time."""
+
+
+def release_lock(lock_key, token):
+    backend = caches[DEFAULT_CACHE_ALIAS]
+    if isinstance(backend, RedisCache):
+        # Integers are stored unpickled, so the script can compare them
+        key = backend.make_and_validate_key(lock_key)
+        client = backend._cache.get_client(key, write=True)
+        client.eval(RELEASE_LOCK_SCRIPT, 1, key, token)
+    elif cache.get(lock_key) == token:
+        # Other backends are process-local or used in tests only
+        cache.delete(lock_key)
+
+
+class DatabaseCartStorage:
+    def get_cart(self, user):
+        return services.get_cart(user)
+
+    def add(self, user, product_id, quantity):
+        services.add_to_cart(user, product_id, quantity)
+
+    def apply(self, user, operations):
+        services.apply_cart_operations(user, operations)
+
+    def remove(self, user, product_id):
+        return services.remove_from_cart(user, product_id)
+
+    def clear(self, user):
+        services.clear_cart(user)
+
+    def flush(self, user_id):
+        """Nothing is buffered; rows are always up to date."""
+
+    def validators(self, user):
+        return services.cart_validators(user)
+
+
+class CacheCartStorage:
+    lock_timeout = 5
+    timeout = None
+
+    def key(self, user_id):
+        return f'cart:{user_id}'
+
+    def owner_id(self, user):
+        return user.pk
+
+    def get_cart(self, user):
+        quantities = self.load(self.owner_id(user))['items']
+        products = Product.objects.for_listing().in_bulk(quantities)
+        items = [
+            CartItem(product=products[product_id], quantity=quantity)
+            for product_id, quantity in quantities.items()
+            if product_id in products
+        ]
+        return {
+            'items': items,
+            'total': sum((item.subtotal for item in items), Decimal('0.00')),
+            'items_count': len(items),
+        }
+
+    def add(self, user, product_id, quantity):
+        self.apply(user, [{'product_id': product_id, 'quantity': quantity, 'op': 'add'}])
+
+    def apply(self, user, operations):
+        owner_id = self.owner_id(user)
+        with self.lock(owner_id):
+            state = self.load(owner_id)
+            quantities = services.fold_operations(state['items'], operations)
+            state['items'] = {
+                product_id: quantity for product_id, quantity in quantities.items() if quantity > 0
+            }
+            self.save(owner_id, state)
+
+    def remove(self, user, product_id):
+        owner_id = self.owner_id(user)
+        with self.lock(owner_id):
+            state = self.load(owner_id)
+            if state['items'].pop(product_id, None) is None:
+                return False
+            self.save(owner_id, state)
+        return True
+
+    def clear(self, user):
+        with self.lock(user.pk):
+            services.clear_cart(user)
+            cache.set(self.key(user.pk), self.new_state({}), timeout=None)
+
+    def flush(self, user_id):
+        with self.lock(user_id):
+            cache.delete(self.flush_scheduled_key(user_id))
+            state = cache.get(self.key(user_id))
+            if state is None or not state['dirty']:
+                return
+            services.replace_cart(user_id, state['items'])
+            state['dirty'] = False
+            cache.set(self.key(user_id), state, timeout=None)
+
+    def validators(self, user):
+        # Prices live on the products, so any catalog change is a new tag.
+        # There is no cheap Last-Modified without reading the products.
+        state = self.load(user.pk)
+        return Validators('cart', user.pk, state['version'], list_version())
+
+    def new_state(self, items, dirty=False):
+        # Versions start from a timestamp so a reloaded cart never reuses
+        # an ETag handed out before it was evicted
+        return {'items': items, 'version': time.time_ns() // 1000, 'dirty': dirty}
+
+    def load(self, user_id):
+        state = cache.get(self.key(user_id))
+        if state is None:
+            state = self.new_state(services.cart_quantities(user_id))
+            if not cache.add(self.key(user_id), state, timeout=None):
+                state = cache.get(self.key(user_id), state)
+        return state
+
+    def save(self, user_id, state):
+        state['version'] += 1
+        state['dirty'] = True
+        cache.set(self.key(user_id), state, timeout=self.timeout)
+        self.schedule_flush(user_id)
+
+    def flush_scheduled_key(self, user_id):
+        return f'cart:{user_id}:flush'
+
+    def schedule_flush(self, user_id):
+        from .tasks import flush_cart
+
+        delay = settings.CART_FLUSH_DELAY
+        # The marker outlives the delay so a lost task is rescheduled later
+        if cache.add(self.flush_scheduled_key(user_id), 1, timeout=delay * 10):
+            flush_cart.apply_async((user_id,), countdown=delay)
+
+    @contextmanager
+    def lock(self, user_id):
+        """
+        Serialize read-modify-write cycles on one cart across workers. A
+        holder that died is waited out for at most ``lock_timeout`` seconds,
+        after which ``CartBusy`` is raised. Only the holder's own token is
+        released, so a lock that expired and was taken over is left alone.
+        """
+        lock_key = f'{self.key(user_id)}:lock'
+        token = secrets.randbits(62)
+        deadline = time.monotonic() + self.lock_timeout
+        while not cache.add(lock_key, token, timeout=self.lock_timeout):
+            if time.monotonic() > deadline:
+                raise CartBusy(f'Cart {user_id} is locked')
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            release_lock(lock_key, token)
+
+
+class GuestCartStorage(CacheCartStorage):
+    """
+    Anonymous carts, kept in the cache only and dropped after
+    ``GUEST_CART_TIMEOUT`` seconds without a change. The owner passed to
+    every method is the guest id rather than a user.
+    """
+
+    @property
+    def timeout(self):
+        return settings.GUEST_CART_TIMEOUT
+
+    def key(self, guest_id):
+        return f'cart:guest:{guest_id}'
+
+    def owner_id(self, guest_id):
+        return guest_id
+
+    def load(self, guest_id):
+        state = cache.get(self.key(guest_id))
+        return self.new_state({}) if state is None else state
+
+    def save(self, guest_id, state):
+        state['version'] += 1
+        cache.set(self.key(guest_id), state, timeout=self.timeout)
+
+    def clear(self, guest_id):
+        cache.delete(self.key(guest_id))
+
+    def flush(self, guest_id):
+        """Guest carts are never persisted."""
+
+    def validators(self, guest_id):
+        state = self.load(guest_id)
+        return Validators('guest-cart', guest_id, state['version'], list_version())
+
+
+_storages = {}
+
+
+def get_cart_storage():
+    path = settings.CART_STORAGE_BACKEND
+    if path not in _storages:
+        _storages[path] = import_string(path)()
+    return _storages[path]
@@ -0,0 +1,12 @@
+from celery import shared_task
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=5)
+def flush_cart(self, user_id):
+    """Write a user's cached cart back to ``CartItem`` (write-behind)."""
+    from .storage import CartBusy, get_cart_storage
+
+    try:
+        get_cart_storage().flush(user_id)
+    except CartBusy as e:
+        raise self.retry(countdown=1, exc=e)
@@ -1,3 +1,261 @@
-from django.test import TestCase
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from products.models import Category, Product, ProductImage
+from .models import CartItem
+from .guest import TOKEN_HEADER, merge_guest_cart
+from .services import add_to_cart
+from .storage import CacheCartStorage, get_cart_storage
+from .throttling import GuestCartThrottle
 
-# Create your tests here.
+User = get_user_model()
+
+
+class CartTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', phone='+998901234567', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Phones', slug='phones')
+        self.products = []
+        for i in range(5):
+            product = Product.objects.create(
+                title=f'Product {i}', description='...', price=Decimal('10.50') + i,
+                category=self.category,
+            )
+            ProductImage.objects.create(product=product, image='products/a.jpg', is_thumbnail=True)
+            self.products.append(product)
+
+
+class CartQueryCountTests(CartTestCase):
+    def setUp(self):
+        super().setUp()
+        for product in self.products[:3]:
+            CartItem.objects.create(user=self.user, product=product, quantity=2)
+
+    def test_get(self):
+        # Validators aggregate, items with products, thumbnails, liked ids
+        # (cached afterwards)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('cart'))
+        data = response.data['data']
+        self.assertEqual(data['items_count'], 3)
+        self.assertEqual(Decimal(data['total']), (Decimal('10.50') + Decimal('11.50') + Decimal('12.50')) * 2)
+        self.assertTrue(data['items'][0]['product']['thumbnail'].endswith('/media/products/a.jpg'))
+
+    def test_add(self):
+        # Product check, upsert, cart read, liked ids
+        with self.assertNumQueries(5):
+            response = self.client.post(reverse('cart'), {'product_id': self.products[3].pk, 'quantity': 1})
+        self.assertEqual(response.data['data']['items_count'], 4)
+
+        with self.assertNumQueries(4):
+            self.client.post(reverse('cart'), {'product_id': self.products[3].pk, 'quantity': 2})
+        self.assertEqual(CartItem.objects.get(user=self.user, product=self.products[3]).quantity, 3)
+
+    def test_remove(self):
+        # Delete, cart read, liked ids
+        with self.assertNumQueries(4):
+            response = self.client.delete(reverse('remove-from-cart', args=[self.products[0].pk]))
+        self.assertEqual(response.data['data']['items_count'], 2)
+
+    def test_removal_is_not_hidden_by_if_modified_since(self):
+        response = self.client.get(reverse('cart'))
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+
+        self.client.delete(reverse('remove-from-cart', args=[self.products[0].pk]))
+        response = self.client.get(
+            reverse('cart'), HTTP_IF_NONE_MATCH=etag,
+            HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['items_count'], 2)
+
+    def test_empty_cart(self):
+        CartItem.objects.all().delete()
+        response = self.client.get(reverse('cart'))
+        self.assertEqual(response.data['data'], {'items': [], 'total': '0.00', 'items_count': 0})
+
+
+class CartBulkUpdateTests(CartTestCase):
+    def test_applies_operations_in_one_transaction(self):
+        keep, bump, drop, new = self.products[:4]
+        CartItem.objects.create(user=self.user, product=keep, quantity=1)
+        CartItem.objects.create(user=self.user, product=bump, quantity=1)
+        CartItem.objects.create(user=self.user, product=drop, quantity=1)
+
+        response = self.client.patch(reverse('cart'), [
+            {'product_id': bump.pk, 'quantity': 2, 'op': 'add'},
+            {'product_id': drop.pk, 'op': 'remove'},
+            {'product_id': new.pk, 'quantity': 4, 'op': 'set'},
+            {'product_id': new.pk, 'quantity': 1, 'op': 'add'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            dict(CartItem.objects.filter(user=self.user).values_list('product_id', 'quantity')),
+            {keep.pk: 1, bump.pk: 3, new.pk: 5},
+        )
+        self.assertEqual(response.data['data']['items_count'], 3)
+
+    def test_rejects_unavailable_products(self):
+        self.products[0].in_stock = False
+        self.products[0].save()
+        response = self.client.patch(reverse('cart'), [
+            {'product_id': self.products[0].pk, 'quantity': 1},
+            {'product_id': self.products[1].pk, 'quantity': 1},
+        ], format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['error']['details']['product_ids'], [self.products[0].pk])
+        self.assertFalse(CartItem.objects.exists())
+
+
+@override_settings(CART_STORAGE_BACKEND='cart.storage.CacheCartStorage')
+@mock.patch.object(CacheCartStorage, 'schedule_flush')
+class CacheCartStorageTests(CartTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        CartItem.objects.create(user=self.user, product=self.products[0], quantity=2)
+
+    def test_writes_are_deferred_until_flush(self, schedule_flush):
+        self.client.get(reverse('cart'))
+        self.client.post(reverse('cart'), {'product_id': self.products[1].pk, 'quantity': 1})
+        self.client.patch(reverse('cart'), [
+            {'product_id': self.products[1].pk, 'quantity': 2},
+            {'product_id': self.products[2].pk, 'quantity': 5, 'op': 'set'},
+        ], format='json')
+        response = self.client.delete(reverse('remove-from-cart', args=[self.products[0].pk]))
+
+        data = response.data['data']
+        self.assertEqual(data['items_count'], 2)
+        self.assertEqual(Decimal(data['total']), Decimal('11.50') * 3 + Decimal('12.50') * 5)
+        self.assertEqual(
+            dict(CartItem.objects.values_list('product_id', 'quantity')), {self.products[0].pk: 2}
+        )
+        schedule_flush.assert_called_with(self.user.pk)
+
+        get_cart_storage().flush(self.user.pk)
+        self.assertEqual(
+            dict(CartItem.objects.values_list('product_id', 'quantity')),
+            {self.products[1].pk: 3, self.products[2].pk: 5},
+        )
+
+    def test_reads_skip_cart_rows(self, schedule_flush):
+        self.client.get(reverse('cart'))
+        # Validators and cart state come from the cache: products, thumbnails
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('cart'))
+        self.assertEqual(response.data['data']['items_count'], 1)
+
+    def test_etag_changes_with_the_cart(self, schedule_flush):
+        etag = self.client.get(reverse('cart'))['ETag']
+        self.assertEqual(self.client.get(reverse('cart'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.client.post(reverse('cart'), {'product_id': self.products[1].pk, 'quantity': 1})
+        self.assertEqual(self.client.get(reverse('cart'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_held_lock_is_not_bypassed_or_stolen(self, schedule_flush):
+        storage = get_cart_storage()
+        lock_key = f'{storage.key(self.user.pk)}:lock'
+        cache.set(lock_key, 42)
+
+        with mock.patch.object(CacheCartStorage, 'lock_timeout', 0.05):
+            response = self.client.post(reverse('cart'), {'product_id': self.products[1].pk, 'quantity': 1})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(cache.get(lock_key), 42)
+        self.assertEqual(storage.load(self.user.pk)['items'], {self.products[0].pk: 2})
+
+        # A holder whose lock expired and was taken over leaves the new one
+        cache.delete(lock_key)
+        with storage.lock(self.user.pk):
+            cache.set(lock_key, 43)
+        self.assertEqual(cache.get(lock_key), 43)
+
+
+class GuestCartTests(CartTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.guest = APIClient()
+
+    def test_guest_cart_round_trip(self):
+        response = self.guest.post(reverse('cart'), {'product_id': self.products[0].pk, 'quantity': 2})
+        self.assertEqual(response.status_code, 200)
+        token = response[TOKEN_HEADER]
+
+        response = self.guest.get(reverse('cart'), HTTP_X_CART_TOKEN=token)
+        self.assertEqual(response.data['data']['items_count'], 1)
+        self.assertEqual(Decimal(response.data['data']['total']), Decimal('21.00'))
+        # The cookie identifies the same cart
+        self.assertEqual(self.guest.get(reverse('cart')).data['data']['items_count'], 1)
+        self.assertFalse(CartItem.objects.exists())
+
+        self.assertEqual(APIClient().get(reverse('cart'), HTTP_X_CART_TOKEN='forged').data['data']['items_count'], 0)
+
+    def test_guest_writes_are_throttled(self):
+        with mock.patch.object(GuestCartThrottle, 'get_rate', return_value='2/hour'):
+            for _ in range(2):
+                self.guest.post(reverse('cart'), {'product_id': self.products[0].pk, 'quantity': 1})
+            response = self.guest.post(reverse('cart'), {'product_id': self.products[0].pk, 'quantity': 1})
+            self.assertEqual(response.status_code, 429)
+            # Reads and signed-in shoppers are not limited
+            self.assertEqual(self.guest.get(reverse('cart')).data['data']['items_count'], 1)
+            response = self.client.post(reverse('cart'), {'product_id': self.products[0].pk, 'quantity': 1})
+            self.assertEqual(response.status_code, 200)
+
+    def test_merge_on_login(self):
+        CartItem.objects.create(user=self.user, product=self.products[0], quantity=1)
+        response = self.guest.patch(reverse('cart'), [
+            {'product_id': self.products[0].pk, 'quantity': 2},
+            {'product_id': self.products[1].pk, 'quantity': 1},
+            {'product_id': self.products[2].pk, 'quantity': 1},
+        ], format='json')
+        Product.objects.filter(pk=self.products[2].pk).update(in_stock=False)
+
+        request = RequestFactory().post('/', HTTP_X_CART_TOKEN=response[TOKEN_HEADER])
+        # Availability check, then one transaction: locked read and one bulk upsert
+        with self.assertNumQueries(5):
+            merge_guest_cart(request, self.user)
+
+        self.assertEqual(
+            dict(CartItem.objects.values_list('product_id', 'quantity')),
+            {self.products[0].pk: 3, self.products[1].pk: 1},
+        )
+        self.assertEqual(self.guest.get(reverse('cart')).data['data']['items_count'], 0)
+
+
+class ConcurrentAddToCartTests(TransactionTestCase):
+    workers = 8
+    adds_per_worker = 5
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', phone='+998901234567', password='secret')
+        category = Category.objects.create(name='Phones', slug='phones')
+        self.product = Product.objects.create(title='Phone', description='...', price=1, category=category)
+
+    def add_repeatedly(self, barrier):
+        try:
+            barrier.wait()
+            for _ in range(self.adds_per_worker):
+                add_to_cart(self.user, self.product.pk, 1)
+        finally:
+            connection.close()
+
+    def test_parallel_adds_are_not_lost(self):
+        barrier = threading.Barrier(self.workers)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self.add_repeatedly, barrier) for _ in range(self.workers)]
+            for future in futures:
+                future.result()
+
+        item = CartItem.objects.get(user=self.user, product=self.product)
+        self.assertEqual(item.quantity, self.workers * self.adds_per_worker)
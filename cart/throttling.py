@@ -0,0 +1,15 @@
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import AnonRateThrottle
+
+
+class GuestCartThrottle(AnonRateThrottle):
+    """
+    Per-IP limit on anonymous cart writes, each of which can create a
+    guest cart in the cache. Reads and signed-in users are not counted.
+    """
+    scope = 'guest_cart'
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        return super().allow_request(request, view)
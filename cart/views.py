@@ -1,94 +1,139 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from django.db.models import Sum, F
-from .models import CartItem
+from django.conf import settings
+from config.idempotency import idempotent
 from products.models import Product
-from .serializers import AddToCartSerializer, CartItemSerializer
+from .serializers import AddToCartSerializer, CartOperationSerializer, CartSerializer
+from .services import unavailable_products
+from .guest import attach_guest_token, get_guest_id, guest_storage
+from .storage import CartBusy, get_cart_storage
+from .throttling import GuestCartThrottle
 
 
-@api_view(['GET', 'POST'])
-@permission_classes([IsAuthenticated])
-def cart_view(request):
-    if request.method == 'GET':
-        cart_items = CartItem.objects.filter(user=request.user).select_related('product')
-        total = sum(item.subtotal for item in cart_items)
+def resolve_cart(request):
+    """The storage engine and owner (user or guest id) of the request's cart."""
+    if request.user.is_authenticated:
+        return get_cart_storage(), request.user
+    return guest_storage, get_guest_id(request)
 
-        return Response({
-            'success': True,
-            'data': {
-                'items': CartItemSerializer(cart_items, many=True, context={'request': request}).data,
-                'total': total,
-                'items_count': cart_items.count()
-            }
-        })
-
-    elif request.method == 'POST':
-        serializer = AddToCartSerializer(data=request.data)
-        if serializer.is_valid():
-            product_id = serializer.validated_data['product_id']
-            quantity = serializer.validated_data['quantity']
-
-            try:
-                product = Product.objects.get(id=product_id, in_stock=True)
-            except Product.DoesNotExist:
-                return Response({
-                    'success': False,
-                    'error': {'message': 'Product not found or out of stock'}
-                }, status=status.HTTP_404_NOT_FOUND)
-
-            cart_item, created = CartItem.objects.get_or_create(
-                user=request.user,
-                product=product,
-                defaults={'quantity': quantity}
-            )
-
-            if not created:
-                cart_item.quantity += quantity
-                cart_item.save()
-
-            # Return updated cart
-            cart_items = CartItem.objects.filter(user=request.user).select_related('product')
-            total = sum(item.subtotal for item in cart_items)
 
-            return Response({
-                'success': True,
-                'data': {
-                    'items': CartItemSerializer(cart_items, many=True, context={'request': request}).data,
-                    'total': total,
-                    'items_count': cart_items.count()
-                }
-            })
+def cart_response(request, storage, owner):
+    cart = storage.get_cart(owner)
+    response = Response({
+        'success': True,
+        'data': CartSerializer(cart, context={'request': request}).data
+    })
+    if storage is guest_storage:
+        attach_guest_token(response, owner)
+    return response
 
+
+def idempotency_owner(storage, owner):
+    return f'guest:{owner}' if storage is guest_storage else f'user:{owner.pk}'
+
+
+def mutate(handler, request, storage, owner, *args):
+    try:
+        return handler(request, storage, owner, *args)
+    except CartBusy:
+        # A 5xx is not stored against the Idempotency-Key, so a retry runs
         return Response({
             'success': False,
-            'error': {'message': 'Invalid data', 'details': serializer.errors}
-        }, status=status.HTTP_400_BAD_REQUEST)
+            'error': {'message': 'Cart is being updated, please retry'}
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
 
 
-@api_view(['DELETE'])
-@permission_classes([IsAuthenticated])
-def remove_from_cart(request, product_id):
-    try:
-        cart_item = CartItem.objects.get(user=request.user, product_id=product_id)
-        cart_item.delete()
+def add_item(request, storage, owner):
+    serializer = AddToCartSerializer(data=request.data)
+    if serializer.is_valid():
+        product_id = serializer.validated_data['product_id']
+        quantity = serializer.validated_data['quantity']
+
+        if not Product.objects.filter(id=product_id, in_stock=True).exists():
+            return Response({
+                'success': False,
+                'error': {'message': 'Product not found or out of stock'}
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        storage.add(owner, product_id, quantity)
 
         # Return updated cart
-        cart_items = CartItem.objects.filter(user=request.user).select_related('product')
-        total = sum(item.subtotal for item in cart_items)
+        return cart_response(request, storage, owner)
+
+    return Response({
+        'success': False,
+        'error': {'message': 'Invalid data', 'details': serializer.errors}
+    }, status=status.HTTP_400_BAD_REQUEST)
 
+
+def update_items(request, storage, owner):
+    # Bulk mutation: [{"product_id": 1, "quantity": 2, "op": "set|add|remove"}, ...]
+    serializer = CartOperationSerializer(
+        data=request.data, many=True, allow_empty=False,
+        max_length=settings.CART_BULK_MAX_OPERATIONS,
+    )
+    if not serializer.is_valid():
         return Response({
-            'success': True,
-            'data': {
-                'items': CartItemSerializer(cart_items, many=True, context={'request': request}).data,
-                'total': total,
-                'items_count': cart_items.count()
+            'success': False,
+            'error': {'message': 'Invalid data', 'details': serializer.errors}
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    operations = serializer.validated_data
+    unavailable = unavailable_products(operations)
+    if unavailable:
+        return Response({
+            'success': False,
+            'error': {
+                'message': 'Product not found or out of stock',
+                'details': {'product_ids': unavailable}
             }
-        })
+        }, status=status.HTTP_404_NOT_FOUND)
 
-    except CartItem.DoesNotExist:
+    storage.apply(owner, operations)
+    return cart_response(request, storage, owner)
+
+
+def remove_item(request, storage, owner, product_id):
+    if not storage.remove(owner, product_id):
         return Response({
             'success': False,
             'error': {'message': 'Product not found in cart'}
-        }, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    # Return updated cart
+    return cart_response(request, storage, owner)
+
+
+@api_view(['GET', 'POST', 'PATCH'])
+@permission_classes([AllowAny])
+@throttle_classes([GuestCartThrottle])
+def cart_view(request):
+    storage, owner = resolve_cart(request)
+
+    if request.method == 'GET':
+        validators = storage.validators(owner)
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+
+        return validators.apply(cart_response(request, storage, owner))
+
+    # Mutations honour Idempotency-Key so retries are not applied twice
+    handler = add_item if request.method == 'POST' else update_items
+    return idempotent(
+        request, 'cart', idempotency_owner(storage, owner),
+        lambda: mutate(handler, request, storage, owner),
+    )
+
+
+@api_view(['DELETE'])
+@permission_classes([AllowAny])
+@throttle_classes([GuestCartThrottle])
+def remove_from_cart(request, product_id):
+    storage, owner = resolve_cart(request)
+    return idempotent(
+        request, 'cart', idempotency_owner(storage, owner),
+        lambda: mutate(remove_item, request, storage, owner, product_id),
+    )
@@ -0,0 +1,47 @@
+"""
+Version counters for caches that are invalidated by key rather than by
+deletion.
+
+A cache key embeds one or more counters; bumping a counter makes every
+entry stored under its old value unreachable, and those entries simply
+age out. Counters start from a timestamp rather than 1, so a counter that
+was evicted from the cache never comes back at a value an old entry was
+stored under.
+"""
+import hashlib
+import time
+from django.core.cache import cache
+
+
+def get_versions(keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns() // 1000, timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns() // 1000, timeout=None)
+
+
+def canonical_query(params, defaults=None):
+    """Sorted (key, value) pairs with empty values and defaults dropped."""
+    defaults = defaults or {}
+    return sorted(
+        (key, value)
+        for key in params
+        for value in params.getlist(key)
+        if value != '' and defaults.get(key) != value
+    )
+
+
+def request_digest(request, params=()):
+    # Bodies contain absolute URLs, so the origin is part of the key
+    raw = repr((request.scheme, request.get_host(), list(params)))
+    return hashlib.md5(raw.encode()).hexdigest()
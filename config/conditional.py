@@ -0,0 +1,33 @@
+"""
+Conditional GET helpers shared by the API views.
+
+Views build validators from cheap columns (``updated_at``, counts, cache
+version counters) before serializing anything, answer matching
+``If-None-Match`` / ``If-Modified-Since`` requests with a 304, and attach
+the same validators to full responses.
+"""
+import hashlib
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+class Validators:
+    def __init__(self, *parts, last_modified=None):
+        digest = hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+        self.etag = quote_etag(digest)
+        self.last_modified = int(last_modified.timestamp()) if last_modified else None
+
+    def not_modified(self, request):
+        """Return a 304 response if the client's copy is current, else None."""
+        response = get_conditional_response(
+            request, etag=self.etag, last_modified=self.last_modified
+        )
+        if response is not None:
+            self.apply(response)
+        return response
+
+    def apply(self, response):
+        response['ETag'] = self.etag
+        if self.last_modified is not None:
+            response['Last-Modified'] = http_date(self.last_modified)
+        return response
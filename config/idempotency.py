@@ -0,0 +1,126 @@
+"""
+``Idempotency-Key`` support for unsafe API requests.
+
+The first response to a key is stored per owner and replayed verbatim
+(with ``Idempotent-Replayed: true``) for retries carrying the same key.
+While the first request is still running, duplicates wait for its result
+for up to ``IDEMPOTENCY_WAIT_TIMEOUT`` seconds and then get a 409. Reusing
+a key for a different request is a 422. Server errors are not stored, so
+the client can retry them.
+"""
+import hashlib
+import json
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+
+class CacheIdempotencyStore:
+    """
+    Records live in the cache: ``{'fingerprint', 'status', 'data',
+    'headers'}``, with ``status`` None while the request is in flight.
+    """
+
+    def cache_key(self, scope, owner, key):
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return f'idempotency:{scope}:{owner}:{digest}'
+
+    def get(self, scope, owner, key):
+        return cache.get(self.cache_key(scope, owner, key))
+
+    def claim(self, scope, owner, key, fingerprint):
+        """Mark the key in flight; False if someone else holds it."""
+        return cache.add(
+            self.cache_key(scope, owner, key),
+            {'fingerprint': fingerprint, 'status': None},
+            timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT,
+        )
+
+    def save(self, scope, owner, key, record):
+        cache.set(self.cache_key(scope, owner, key), record, timeout=settings.IDEMPOTENCY_KEY_TTL)
+
+    def release(self, scope, owner, key):
+        cache.delete(self.cache_key(scope, owner, key))
+
+
+cache_store = CacheIdempotencyStore()
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    raw = f'{request.method}:{request.path}:{body}'
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def error_response(message, status_code):
+    return Response({
+        'success': False,
+        'error': {'message': message}
+    }, status=status_code)
+
+
+def replay(record):
+    response = Response(record['data'], status=record['status'])
+    for name, value in record['headers'].items():
+        response[name] = value
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(request, scope, owner, handler, store=cache_store):
+    """
+    Run ``handler()`` at most once per ``Idempotency-Key`` for ``owner``
+    within ``scope``. Requests without the header run as usual.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        return handler()
+    if len(key) > MAX_KEY_LENGTH:
+        return error_response(
+            f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters',
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    fingerprint = request_fingerprint(request)
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    while not store.claim(scope, owner, key, fingerprint):
+        record = store.get(scope, owner, key)
+        if record is not None and record['fingerprint'] != fingerprint:
+            return error_response(
+                f'{IDEMPOTENCY_HEADER} was already used for a different request',
+                status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if record is not None and record['status'] is not None:
+            return replay(record)
+        if time.monotonic() > deadline:
+            return error_response(
+                'A request with this idempotency key is still in progress',
+                status.HTTP_409_CONFLICT,
+            )
+        time.sleep(0.1)
+
+    try:
+        response = handler()
+    except Exception:
+        store.release(scope, owner, key)
+        raise
+
+    if response.status_code >= 500:
+        store.release(scope, owner, key)
+    else:
+        store.save(scope, owner, key, {
+            'fingerprint': fingerprint,
+            'status': response.status_code,
+            'data': response.data,
+            'headers': {
+                name: value for name, value in response.items()
+                if name.lower() not in ('content-type', 'content-length', 'vary', 'allow')
+            },
+        })
+    return response
@@ -0,0 +1,166 @@
+"""Pagination shared by the API apps."""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on ``(<ordering field>, id)``.
+
+    Each page is fetched with a ``WHERE (field, id) > (value, pk)`` style
+    condition instead of OFFSET, and no COUNT(*) is issued. Cursors are
+    opaque base64 tokens carrying the ordering, the boundary row and the
+    direction.
+    """
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = '-created_at'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering_term = self.get_ordering(request, queryset, view)
+        self.field = self.ordering_term.lstrip('-')
+        descending = self.ordering_term.startswith('-')
+
+        cursor = self.decode_cursor(request)
+        self.reverse = cursor['r'] if cursor else False
+
+        # Walking backwards means scanning in the opposite direction
+        scan_descending = descending != self.reverse
+        prefix = '-' if scan_descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')
+
+        if cursor:
+            lookup = 'lt' if scan_descending else 'gt'
+            try:
+                queryset = queryset.filter(
+                    Q(**{f'{self.field}__{lookup}': cursor['v']}) |
+                    Q(**{self.field: cursor['v'], f'id__{lookup}': cursor['id']})
+                )
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'success': True,
+            'data': data,
+            'meta': {
+                'pagination': {
+                    'count': len(data),
+                    'per_page': self.page_size,
+                    'links': {
+                        'next': self.get_next_link(),
+                        'prev': self.get_previous_link()
+                    }
+                }
+            }
+        })
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.build_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.build_link(self.page[0], reverse=True)
+
+    def build_link(self, obj, reverse):
+        url = self.request.build_absolute_uri()
+        cursor = self.encode_cursor({
+            'o': self.ordering_term,
+            'v': self.encode_value(getattr(obj, self.field)),
+            'id': obj.pk,
+            'r': reverse,
+        })
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def encode_value(self, value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    def encode_cursor(self, payload):
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            valid = (
+                isinstance(cursor, dict) and
+                cursor.get('o') == self.ordering_term and
+                isinstance(cursor.get('id'), int) and
+                isinstance(cursor.get('r'), bool) and
+                'v' in cursor
+            )
+        except (binascii.Error, ValueError):
+            valid = False
+        if not valid:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
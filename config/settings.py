@@ -88,6 +88,11 @@ REST_FRAMEWORK = {
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    # Rates by throttle scope; views opt in through their throttle_classes
+    'DEFAULT_THROTTLE_RATES': {
+        'product_export': config('PRODUCT_EXPORT_THROTTLE_RATE', default='10/hour'),
+        'guest_cart': config('GUEST_CART_THROTTLE_RATE', default='120/hour'),
+    },
 }
 
 # JWT settings
@@ -121,10 +126,101 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'release-expired-stock-reservations': {
+        'task': 'orders.tasks.release_expired_stock_reservations',
+        'schedule': 60.0,
+    },
+    'purge-idempotency-keys': {
+        'task': 'orders.tasks.purge_idempotency_keys',
+        'schedule': 60.0 * 60,
+    },
+}
+
+# Cache: a shared Redis cache in production so version counters and cached
+# responses are seen by every worker; per-process memory otherwise.
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Cart: maximum number of operations in one bulk PATCH /api/cart/cart/
+CART_BULK_MAX_OPERATIONS = config('CART_BULK_MAX_OPERATIONS', default=100, cast=int)
+
+# Cart storage engine: cart.storage.DatabaseCartStorage, or
+# cart.storage.CacheCartStorage to serve carts from the cache and write them
+# back to the database CART_FLUSH_DELAY seconds after the first change.
+CART_STORAGE_BACKEND = config('CART_STORAGE_BACKEND', default='cart.storage.DatabaseCartStorage')
+CART_FLUSH_DELAY = config('CART_FLUSH_DELAY', default=30, cast=int)
+
+# Anonymous carts live in the cache and expire after this many idle seconds;
+# every guest cart response re-signs the token, so active carts stay alive
+GUEST_CART_TIMEOUT = config('GUEST_CART_TIMEOUT', default=60 * 60 * 24 * 3, cast=int)
+
+# Seconds a pending order holds its stock before it is cancelled
+STOCK_RESERVATION_TTL = config('STOCK_RESERVATION_TTL', default=60 * 30, cast=int)
+
+# Idempotency-Key handling: how long first responses are replayed, how
+# long an unfinished request holds its key, and how long a duplicate waits
+# for the in-flight one before answering 409.
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=60 * 60 * 24, cast=int)
+IDEMPOTENCY_LOCK_TIMEOUT = config('IDEMPOTENCY_LOCK_TIMEOUT', default=60, cast=int)
+IDEMPOTENCY_WAIT_TIMEOUT = config('IDEMPOTENCY_WAIT_TIMEOUT', default=10, cast=int)
+
+# Seconds an order history total (?include_total=true) may be served from cache
+ORDER_COUNT_CACHE_TIMEOUT = config('ORDER_COUNT_CACHE_TIMEOUT', default=60 * 10, cast=int)
+
+# Seconds a user's set of liked product ids is cached (dropped on every toggle)
+LIKED_PRODUCTS_CACHE_TIMEOUT = config('LIKED_PRODUCTS_CACHE_TIMEOUT', default=60 * 60, cast=int)
 
 # External SMS service (if used)
 SMS_SERVICE_URL = config('SMS_SERVICE_URL', default='')
 SMS_SERVICE_TOKEN = config('SMS_SERVICE_TOKEN', default='')
 
+# SMS delivery (authentication.sms). SMS_PROVIDER is a dotted path; when
+# empty, Eskiz is used if SMS_EMAIL is set and the logging stub otherwise.
+SMS_PROVIDER = config('SMS_PROVIDER', default='')
+SMS_EMAIL = config('SMS_EMAIL', default='')
+SMS_PASSWORD = config('SMS_PASSWORD', default='')
+SMS_SENDER = config('SMS_SENDER', default='4546')
+SMS_BASE_URL = config('SMS_BASE_URL', default='https://notify.eskiz.uz/api')
+SMS_TIMEOUT = config('SMS_TIMEOUT', default=10, cast=int)
+SMS_POOL_SIZE = config('SMS_POOL_SIZE', default=10, cast=int)
+# Eskiz tokens live 30 days; refresh a day early
+SMS_TOKEN_TTL = config('SMS_TOKEN_TTL', default=60 * 60 * 24 * 29, cast=int)
+SMS_STUB_LATENCY = config('SMS_STUB_LATENCY', default=0, cast=float)
+
+# Product search: dotted path to a products.search backend. When empty the
+# backend follows the database vendor (tsvector on PostgreSQL, FTS5 on SQLite).
+# Run `manage.py reindex_products` after changing PRODUCT_SEARCH_CONFIG.
+PRODUCT_SEARCH_BACKEND = config('PRODUCT_SEARCH_BACKEND', default='')
+PRODUCT_SEARCH_CONFIG = config('PRODUCT_SEARCH_CONFIG', default='simple')
+
+# Product facets: lower bounds of the price buckets (the last bucket is
+# open-ended) and how long facet counts may be cached (0 disables caching).
+PRODUCT_FACET_PRICE_BUCKETS = [0, 50, 100, 250, 500, 1000]
+PRODUCT_FACET_ATTRIBUTE_LIMIT = 20
+PRODUCT_FACETS_CACHE_TIMEOUT = config('PRODUCT_FACETS_CACHE_TIMEOUT', default=60, cast=int)
+
+# Maximum number of ids accepted by /api/products/batch/
+PRODUCT_BATCH_MAX_IDS = config('PRODUCT_BATCH_MAX_IDS', default=50, cast=int)
+
+# Rows fetched per database round trip by the catalog export
+PRODUCT_EXPORT_CHUNK_SIZE = config('PRODUCT_EXPORT_CHUNK_SIZE', default=1000, cast=int)
+
+# Anonymous catalog responses. Entries are invalidated through version
+# counters (products.cache); the timeout only bounds memory use.
+PRODUCT_CACHE_TIMEOUT = config('PRODUCT_CACHE_TIMEOUT', default=3600, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -0,0 +1,62 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from config.idempotency import CacheIdempotencyStore
+from .models import IdempotencyKey
+
+
+class OrderIdempotencyStore(CacheIdempotencyStore):
+    """
+    Cache in front of the ``IdempotencyKey`` table. The owner is the user
+    id. Completed records are read from the cache first and fall back to
+    the table; in-flight claims are rows with no status yet, and claims
+    older than ``IDEMPOTENCY_LOCK_TIMEOUT`` are treated as abandoned.
+    """
+
+    def get(self, scope, owner, key):
+        record = super().get(scope, owner, key)
+        if record is not None and record['status'] is not None:
+            return record
+
+        row = IdempotencyKey.objects.filter(user_id=owner, key=key).first()
+        if row is None:
+            return None
+        record = {
+            'fingerprint': row.fingerprint,
+            'status': row.status_code,
+        }
+        if row.status_code is not None:
+            record.update(row.response)
+            super().save(scope, owner, key, record)
+        return record
+
+    def claim(self, scope, owner, key, fingerprint):
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(user_id=owner, key=key, fingerprint=fingerprint)
+            return True
+        except IntegrityError:
+            pass
+        # Take over a claim whose request died without finishing
+        stale = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+        return bool(
+            IdempotencyKey.objects.filter(
+                user_id=owner, key=key, fingerprint=fingerprint,
+                status_code__isnull=True, created_at__lt=stale,
+            ).update(created_at=timezone.now())
+        )
+
+    def save(self, scope, owner, key, record):
+        IdempotencyKey.objects.filter(user_id=owner, key=key).update(
+            status_code=record['status'],
+            response={'data': record['data'], 'headers': record['headers']},
+        )
+        super().save(scope, owner, key, record)
+
+    def release(self, scope, owner, key):
+        IdempotencyKey.objects.filter(user_id=owner, key=key, status_code__isnull=True).delete()
+        super().release(scope, owner, key)
+
+
+order_store = OrderIdempotencyStore()
@@ -0,0 +1,140 @@
+"""
+Stock reservation.
+
+Checkout takes stock with one conditional ``UPDATE ... SET stock_quantity
+= stock_quantity - n WHERE stock_quantity >= n`` per tracked product, in
+product id order so concurrent checkouts lock rows in the same order and
+cannot deadlock. Only the rows being bought are locked, and only until the
+checkout transaction commits. ``in_stock`` is derived in the same
+statement.
+
+Every decrement is recorded as a held ``StockReservation``. Holds are
+committed when the order moves past ``pending`` and released (stock put
+back) when it is cancelled, whether or not they were committed, or when
+it is still pending after ``STOCK_RESERVATION_TTL`` seconds, in which
+case the order is cancelled.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from products.cache import bump_product_versions
+from products.models import Product
+from .models import Order, StockReservation
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product):
+        super().__init__(f'Not enough stock for "{product.title}"')
+        self.product = product
+
+
+def reserve_stock(order, items):
+    """
+    Take stock for ``items`` (unsaved or saved OrderItems of ``order``) and
+    record the holds. Must run inside the checkout transaction; raises
+    InsufficientStock, leaving the rollback to the caller.
+    """
+    now = timezone.now()
+    quantities = defaultdict(int)
+    products = {}
+    for item in items:
+        quantities[item.product_id] += item.quantity
+        products[item.product_id] = item.product
+
+    reserved = []
+    for product_id in sorted(quantities):
+        product, quantity = products[product_id], quantities[product_id]
+        if product.stock_quantity is None:
+            if not product.in_stock:
+                raise InsufficientStock(product)
+            continue
+
+        taken = Product.objects.filter(pk=product_id, stock_quantity__gte=quantity).update(
+            stock_quantity=F('stock_quantity') - quantity,
+            in_stock=Case(
+                When(stock_quantity__gt=quantity, then=Value(True)),
+                default=Value(False),
+            ),
+            updated_at=now,
+        )
+        if not taken:
+            raise InsufficientStock(product)
+        reserved.append(product_id)
+
+    StockReservation.objects.bulk_create([
+        StockReservation(
+            order=order, product_id=product_id, quantity=quantities[product_id],
+            expires_at=now + timedelta(seconds=settings.STOCK_RESERVATION_TTL),
+        )
+        for product_id in reserved
+    ])
+    # Detail and list bodies show in_stock; UPDATEs bypass the model signals
+    transaction.on_commit(lambda: bump_product_versions(reserved))
+
+
+def commit_reservations(order_ids):
+    StockReservation.objects.filter(order_id__in=order_ids, status='held').update(status='committed')
+
+
+def release_reservations(reservations, batch_size=500, statuses=('held',)):
+    """
+    Put the stock of ``reservations`` in ``statuses`` back, one batch per
+    transaction. Returns the ids of the orders whose holds were released.
+    """
+    order_ids = set()
+    while True:
+        with transaction.atomic():
+            batch = list(
+                reservations.filter(status__in=statuses)
+                .select_for_update(skip_locked=True)
+                .order_by('id')
+                .values_list('id', 'order_id', 'product_id', 'quantity')[:batch_size]
+            )
+            if not batch:
+                break
+
+            quantities = defaultdict(int)
+            for _, order_id, product_id, quantity in batch:
+                quantities[product_id] += quantity
+                order_ids.add(order_id)
+
+            now = timezone.now()
+            for product_id in sorted(quantities):
+                Product.objects.filter(pk=product_id, stock_quantity__isnull=False).update(
+                    stock_quantity=F('stock_quantity') + quantities[product_id],
+                    in_stock=True,
+                    updated_at=now,
+                )
+            StockReservation.objects.filter(pk__in=[row[0] for row in batch]).update(status='released')
+            transaction.on_commit(lambda ids=list(quantities): bump_product_versions(ids))
+    return order_ids
+
+
+def restock(product_id, quantity):
+    """
+    Add ``quantity`` received units to a tracked product. Stock is only
+    ever moved by relative updates, so concurrent checkouts are not undone.
+    """
+    updated = Product.objects.filter(pk=product_id, stock_quantity__isnull=False).update(
+        stock_quantity=F('stock_quantity') + quantity,
+        in_stock=True,
+        updated_at=timezone.now(),
+    )
+    if updated:
+        transaction.on_commit(lambda: bump_product_versions([product_id]))
+    return bool(updated)
+
+
+def release_expired_reservations(batch_size=500):
+    """Release holds that outlived their TTL and cancel their pending orders."""
+    expired = StockReservation.objects.filter(
+        expires_at__lte=timezone.now(), order__status='pending'
+    )
+    order_ids = release_reservations(expired, batch_size)
+    Order.objects.filter(pk__in=order_ids, status='pending').update(
+        status='cancelled', updated_at=timezone.now()
+    )
+    return len(order_ids)
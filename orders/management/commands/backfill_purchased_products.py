@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from orders.purchases import backfill_purchases
+
+
+class Command(BaseCommand):
+    help = "Fill the PurchasedProduct index from orders that were already delivered"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = 0
+        for count in backfill_purchases(batch_size=options['batch_size']):
+            total += count
+            self.stdout.write(f"Processed {total} purchases")
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {total} purchases"))
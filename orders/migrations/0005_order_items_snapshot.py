@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_user_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='items_snapshot',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth import get_user_model
 from products.models import Product
@@ -24,11 +25,15 @@ class Order(models.Model):
     shipping_fee = models.DecimalField(max_digits=10, decimal_places=2, default=5.00)
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     tracking_number = models.CharField(max_length=100, blank=True, null=True)
+    # Line items as bought (see orders.services.items_snapshot); NULL for
+    # orders placed before snapshots existed until they are first read
+    items_snapshot = models.JSONField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['user', 'created_at'])]
 
     def save(self, *args, **kwargs):
         if not self.order_number:
@@ -60,4 +65,66 @@ class OrderItem(models.Model):
 
     def save(self, *args, **kwargs):
         self.subtotal = self.quantity * self.price
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class StockReservation(models.Model):
+    """
+    Stock taken from a product for a pending order. Held units are
+    committed once the order moves on, or put back when it is cancelled or
+    the hold expires (see orders.inventory).
+    """
+    STATUS_CHOICES = [
+        ('held', 'Held'),
+        ('committed', 'Committed'),
+        ('released', 'Released'),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='held')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'expires_at'])]
+
+    def __str__(self):
+        return f"{self.order} - {self.product} x {self.quantity} ({self.status})"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Durable record of an ``Idempotency-Key`` used to create an order, so a
+    retried checkout is replayed even after the cache entry is gone.
+    ``status_code`` is NULL while the first request is still running.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
+
+
+class PurchasedProduct(models.Model):
+    """
+    One row per (user, product) the user has received, so review
+    eligibility is a unique-key lookup (see orders.purchases).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='purchased_products')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='purchases')
+    first_delivered_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'product')
+
+    def __str__(self):
+        return f"{self.user} - {self.product}"
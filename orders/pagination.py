@@ -1,6 +1,44 @@
-from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
+from django.core.cache import cache
+from config.cache import canonical_query, get_versions, request_digest
+from config.pagination import KeysetPagination
 
-class OrderPagination(PageNumberPagination):
-    page_size = 20
-    page_size_query_param = 'limit'
-    max_page_size = 100
\ No newline at end of file
+
+def order_version_key(user_id):
+    return f'orders:version:user:{user_id}'
+
+
+class OrderPagination(KeysetPagination):
+    """
+    Keyset pagination on ``(-created_at, id)``. No COUNT(*) is run unless
+    the client asks for ``include_total=true``; that count is cached per
+    user until one of their orders changes.
+    """
+    ordering = '-created_at'
+    total_query_param = 'include_total'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.total = None
+        if request.query_params.get(self.total_query_param) == 'true':
+            self.total = self.get_total(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_total(self, queryset, request):
+        version, = get_versions([order_version_key(request.user.pk)])
+        paging = (self.cursor_query_param, self.page_size_query_param)
+        params = [
+            (key, value) for key, value in canonical_query(request.query_params)
+            if key not in paging
+        ]
+        cache_key = f'orders:count:{request.user.pk}:{version}:{request_digest(request, params)}'
+        total = cache.get(cache_key)
+        if total is None:
+            total = queryset.count()
+            cache.set(cache_key, total, settings.ORDER_COUNT_CACHE_TIMEOUT)
+        return total
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.total is not None:
+            response.data['meta']['pagination']['total'] = self.total
+        return response
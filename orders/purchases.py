@@ -0,0 +1,61 @@
+"""
+Purchase index behind review eligibility.
+
+``PurchasedProduct`` gets a row the first time an order containing the
+product reaches one of ``ELIGIBLE_STATUSES``; both review endpoints ask
+``has_purchased`` instead of joining orders and their items.
+"""
+from django.db.models import Min
+from django.utils import timezone
+from .models import OrderItem, PurchasedProduct
+
+ELIGIBLE_STATUSES = ('delivered',)
+
+
+def has_purchased(user, product_id):
+    return PurchasedProduct.objects.filter(user=user, product_id=product_id).exists()
+
+
+def record_purchases(order):
+    """Index the products of an order that has just become eligible."""
+    if order.items_snapshot is not None:
+        product_ids = {line['product_id'] for line in order.items_snapshot}
+    else:
+        product_ids = set(OrderItem.objects.filter(order=order).values_list('product_id', flat=True))
+    now = timezone.now()
+    # The first delivery wins; later ones hit the unique key and are skipped
+    PurchasedProduct.objects.bulk_create(
+        [
+            PurchasedProduct(user_id=order.user_id, product_id=product_id, first_delivered_at=now)
+            for product_id in product_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def backfill_purchases(batch_size=1000):
+    """
+    Index every eligible order placed so far, ``batch_size`` rows per
+    INSERT, yielding the size of each batch. An order's ``updated_at``
+    stands in for its delivery time.
+    """
+    rows = (
+        OrderItem.objects.filter(order__status__in=ELIGIBLE_STATUSES)
+        .values('order__user', 'product')
+        .annotate(first_delivered_at=Min('order__updated_at'))
+        .order_by()
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(PurchasedProduct(
+            user_id=row['order__user'],
+            product_id=row['product'],
+            first_delivered_at=row['first_delivered_at'],
+        ))
+        if len(batch) == batch_size:
+            PurchasedProduct.objects.bulk_create(batch, ignore_conflicts=True)
+            yield len(batch)
+            batch = []
+    if batch:
+        PurchasedProduct.objects.bulk_create(batch, ignore_conflicts=True)
+        yield len(batch)
@@ -1,24 +1,19 @@
 from rest_framework import serializers
-from .models import Order, OrderItem
-from products.serializers import ProductListSerializer
-
-
-class OrderItemSerializer(serializers.ModelSerializer):
-    product = ProductListSerializer(read_only=True)
-
-    class Meta:
-        model = OrderItem
-        fields = ['product', 'quantity', 'price', 'subtotal']
+from .models import Order
+from .services import CheckoutError, checkout
 
 
 class OrderListSerializer(serializers.ModelSerializer):
+    # Annotated by the list view; the model property would query per order
+    items_count = serializers.IntegerField(source='item_count', read_only=True)
+
     class Meta:
         model = Order
         fields = ['id', 'order_number', 'created_at', 'status', 'total', 'items_count']
 
 
 class OrderDetailSerializer(serializers.ModelSerializer):
-    items = OrderItemSerializer(many=True, read_only=True)
+    items = serializers.SerializerMethodField()
 
     class Meta:
         model = Order
@@ -28,6 +23,26 @@ class OrderDetailSerializer(serializers.ModelSerializer):
             'total', 'tracking_number'
         ]
 
+    def get_items(self, obj):
+        # Served from the checkout snapshot; no product queries
+        request = self.context.get('request')
+        return [
+            {
+                'product': {
+                    'id': line['product_id'],
+                    'title': line['title'],
+                    'thumbnail': (
+                        request.build_absolute_uri(line['thumbnail'])
+                        if line['thumbnail'] and request else line['thumbnail']
+                    ),
+                },
+                'quantity': line['quantity'],
+                'price': line['price'],
+                'subtotal': line['subtotal'],
+            }
+            for line in obj.items_snapshot or []
+        ]
+
 
 class OrderCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -36,28 +51,7 @@ class OrderCreateSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         user = self.context['request'].user
-        cart = user.cart
-
-        if not cart.items.exists():
-            raise serializers.ValidationError("Cart is empty")
-
-        order = Order.objects.create(user=user, **validated_data)
-
-        # Create order items from cart
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price
-            )
-
-        # Calculate totals
-        order.subtotal = sum(item.subtotal for item in order.items.all())
-        order.total = order.subtotal + order.shipping_fee
-        order.save()
-
-        # Clear cart
-        cart.items.all().delete()
-
-        return order
\ No newline at end of file
+        try:
+            return checkout(user, **validated_data)
+        except CheckoutError as exc:
+            raise serializers.ValidationError(str(exc))
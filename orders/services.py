@@ -0,0 +1,108 @@
+from decimal import Decimal
+from django.db import transaction
+from cart.models import CartItem
+from cart.storage import CartBusy, get_cart_storage
+from products.models import thumbnail_prefetch
+from .inventory import InsufficientStock, reserve_stock
+from .models import Order, OrderItem
+
+
+class CheckoutError(Exception):
+    pass
+
+
+def checkout(user, shipping_address, notes=''):
+    """
+    Turn the user's cart into an order.
+
+    The cart is read with its products (and their thumbnails) up front and
+    totals are computed in memory; the order, with its line item snapshot,
+    and all of its items are then written with one INSERT each, stock is
+    reserved and the cart is cleared, in a single transaction.
+    """
+    cart_storage = get_cart_storage()
+    # Cached carts are written back lazily; orders are built from the DB
+    try:
+        cart_storage.flush(user.pk)
+    except CartBusy:
+        raise CheckoutError('Cart is being updated, please retry')
+
+    with transaction.atomic():
+        cart_items = list(
+            CartItem.objects.filter(user=user)
+            .select_related('product')
+            .prefetch_related(thumbnail_prefetch('product__images'))
+            .order_by('product_id')
+        )
+        if not cart_items:
+            raise CheckoutError('Cart is empty')
+
+        items = [
+            OrderItem(
+                product=cart_item.product,
+                quantity=cart_item.quantity,
+                price=cart_item.product.price,
+                subtotal=cart_item.product.price * cart_item.quantity,
+            )
+            for cart_item in cart_items
+        ]
+        order = Order(
+            user=user, shipping_address=shipping_address, notes=notes,
+            items_snapshot=items_snapshot(items),
+        )
+        order.subtotal = sum((item.subtotal for item in items), Decimal('0.00'))
+        order.total = order.subtotal + Decimal(str(order.shipping_fee))
+        order.save()
+
+        for item in items:
+            item.order = order
+        OrderItem.objects.bulk_create(items)
+        try:
+            reserve_stock(order, items)
+        except InsufficientStock as exc:
+            raise CheckoutError(str(exc))
+
+        try:
+            cart_storage.clear(user)
+        except CartBusy:
+            # Rolls the order back rather than leaving the cart behind
+            raise CheckoutError('Cart is being updated, please retry')
+
+    return order
+
+
+def items_snapshot(items):
+    """
+    JSON-ready copy of order lines (title, thumbnail path, price, quantity)
+    so order detail never needs the product tables. Products must have
+    their ``thumbnails`` prefetched.
+    """
+    snapshot = []
+    for item in items:
+        thumbnail = item.product.thumbnails[0] if item.product.thumbnails else None
+        snapshot.append({
+            'product_id': item.product_id,
+            'title': item.product.title,
+            'thumbnail': thumbnail.image.url if thumbnail else None,
+            'price': str(item.price),
+            'quantity': item.quantity,
+            'subtotal': str(item.subtotal),
+        })
+    return snapshot
+
+
+def backfill_items_snapshot(order):
+    """
+    Snapshot an order placed before snapshots existed. Prices come from
+    its items; titles and thumbnails are the products' current ones.
+    """
+    items = (
+        OrderItem.objects.filter(order=order)
+        .select_related('product')
+        .prefetch_related(thumbnail_prefetch('product__images'))
+        .order_by('product_id')
+    )
+    order.items_snapshot = items_snapshot(items)
+    # update() keeps updated_at, which is what the order's ETag is built on
+    Order.objects.filter(pk=order.pk).update(items_snapshot=order.items_snapshot)
+    return order
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from config.cache import bump_versions
+from .inventory import commit_reservations, release_reservations
+from .models import Order, StockReservation
+from .pagination import order_version_key
+from .purchases import ELIGIBLE_STATUSES, record_purchases
+
+
+@receiver(post_save, sender=Order)
+def settle_reservations(sender, instance, created, **kwargs):
+    if created or instance.status == 'pending':
+        return
+    if instance.status == 'cancelled':
+        # Cancelling after the order was confirmed restocks as well
+        release_reservations(
+            StockReservation.objects.filter(order=instance), statuses=('held', 'committed')
+        )
+    else:
+        commit_reservations([instance.pk])
+
+
+@receiver(post_save, sender=Order)
+def index_purchases(sender, instance, **kwargs):
+    if instance.status in ELIGIBLE_STATUSES:
+        record_purchases(instance)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_order_counts(sender, instance, **kwargs):
+    bump_versions([order_version_key(instance.user_id)])
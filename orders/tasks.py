@@ -0,0 +1,22 @@
+from celery import shared_task
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .inventory import release_expired_reservations
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def release_expired_stock_reservations():
+    released = release_expired_reservations()
+    if released:
+        logger.info(f"Released expired stock reservations of {released} orders")
+
+
+@shared_task(ignore_result=True)
+def purge_idempotency_keys():
+    cutoff = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
@@ -1,3 +1,278 @@
-from django.test import TestCase
+import hashlib
+import json
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from cart.models import CartItem
+from products.models import Category, Product, ProductImage
+from .inventory import release_expired_reservations, restock
+from .models import IdempotencyKey, Order, OrderItem, StockReservation
+from .services import CheckoutError, checkout
 
-# Create your tests here.
+User = get_user_model()
+
+
+class OrderTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', phone='+998901234567', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(name='Phones', slug='phones')
+        self.products = []
+        for i in range(5):
+            product = Product.objects.create(
+                title=f'Product {i}', description='...', price=Decimal('10.50') + i,
+                category=self.category,
+            )
+            ProductImage.objects.create(product=product, image='products/a.jpg', is_thumbnail=True)
+            self.products.append(product)
+
+    def fill_cart(self, count):
+        for product in self.products[:count]:
+            CartItem.objects.create(user=self.user, product=product, quantity=2)
+
+
+class CheckoutTests(OrderTestCase):
+    def test_checkout_query_count_is_flat(self):
+        for count in (1, 5):
+            CartItem.objects.all().delete()
+            self.fill_cart(count)
+            # Cart read, thumbnails, order insert, items bulk insert, cart delete
+            # (+ savepoint pair)
+            with self.assertNumQueries(7):
+                checkout(self.user, shipping_address='Tashkent')
+
+    def test_totals_and_cart_cleared(self):
+        self.fill_cart(3)
+        response = self.client.post(reverse('orders:order-list-create'), {'shipping_address': 'Tashkent'})
+        self.assertEqual(response.status_code, 201)
+
+        order = Order.objects.get()
+        subtotal = (Decimal('10.50') + Decimal('11.50') + Decimal('12.50')) * 2
+        self.assertEqual(order.subtotal, subtotal)
+        self.assertEqual(order.total, subtotal + Decimal('5.00'))
+        self.assertEqual(
+            sorted(OrderItem.objects.values_list('product_id', 'quantity', 'subtotal')),
+            [(product.pk, 2, product.price * 2) for product in self.products[:3]],
+        )
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(len(response.data['data']['items']), 3)
+
+    def test_empty_cart(self):
+        with self.assertRaises(CheckoutError):
+            checkout(self.user, shipping_address='Tashkent')
+        response = self.client.post(reverse('orders:order-list-create'), {'shipping_address': 'Tashkent'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+class StockReservationTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tracked = self.products[0]
+        self.tracked.stock_quantity = 3
+        self.tracked.save(update_fields=['stock_quantity'])
+
+    def test_checkout_takes_stock(self):
+        CartItem.objects.create(user=self.user, product=self.tracked, quantity=3)
+        CartItem.objects.create(user=self.user, product=self.products[1], quantity=1)
+        order = checkout(self.user, shipping_address='Tashkent')
+
+        self.tracked.refresh_from_db()
+        self.assertEqual(self.tracked.stock_quantity, 0)
+        self.assertFalse(self.tracked.in_stock)
+        reservation = StockReservation.objects.get()
+        self.assertEqual((reservation.order, reservation.product, reservation.quantity), (order, self.tracked, 3))
+
+    def test_stale_product_save_keeps_reserved_stock(self):
+        stale = Product.objects.get(pk=self.tracked.pk)
+        CartItem.objects.create(user=self.user, product=self.tracked, quantity=3)
+        checkout(self.user, shipping_address='Tashkent')
+
+        stale.title = 'Renamed'
+        stale.save()
+        self.tracked.refresh_from_db()
+        self.assertEqual(self.tracked.title, 'Renamed')
+        self.assertEqual((self.tracked.stock_quantity, self.tracked.in_stock), (0, False))
+
+        self.assertTrue(restock(self.tracked.pk, 2))
+        self.tracked.refresh_from_db()
+        self.assertEqual((self.tracked.stock_quantity, self.tracked.in_stock), (2, True))
+        self.assertFalse(restock(self.products[1].pk, 2))
+
+    def test_insufficient_stock_rolls_back(self):
+        CartItem.objects.create(user=self.user, product=self.products[1], quantity=1)
+        CartItem.objects.create(user=self.user, product=self.tracked, quantity=4)
+        with self.assertRaises(CheckoutError):
+            checkout(self.user, shipping_address='Tashkent')
+
+        self.tracked.refresh_from_db()
+        self.assertEqual(self.tracked.stock_quantity, 3)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.count(), 2)
+
+    def test_expired_holds_are_released(self):
+        CartItem.objects.create(user=self.user, product=self.tracked, quantity=3)
+        order = checkout(self.user, shipping_address='Tashkent')
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(release_expired_reservations(), 1)
+        self.tracked.refresh_from_db()
+        self.assertEqual(self.tracked.stock_quantity, 3)
+        self.assertTrue(self.tracked.in_stock)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'cancelled')
+        self.assertEqual(release_expired_reservations(), 0)
+
+    def test_order_status_settles_holds(self):
+        CartItem.objects.create(user=self.user, product=self.tracked, quantity=2)
+        order = checkout(self.user, shipping_address='Tashkent')
+        order.status = 'cancelled'
+        order.save()
+        self.tracked.refresh_from_db()
+        self.assertEqual(self.tracked.stock_quantity, 3)
+
+        CartItem.objects.create(user=self.user, product=self.tracked, quantity=2)
+        order = checkout(self.user, shipping_address='Tashkent')
+        order.status = 'processing'
+        order.save()
+        self.assertEqual(StockReservation.objects.get(order=order).status, 'committed')
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(release_expired_reservations(), 0)
+
+    def test_cancelling_a_committed_order_restocks(self):
+        CartItem.objects.create(user=self.user, product=self.tracked, quantity=2)
+        order = checkout(self.user, shipping_address='Tashkent')
+        order.status = 'processing'
+        order.save()
+
+        order.status = 'cancelled'
+        order.save()
+        self.tracked.refresh_from_db()
+        self.assertEqual(self.tracked.stock_quantity, 3)
+        self.assertEqual(StockReservation.objects.get(order=order).status, 'released')
+
+        # Saving the cancelled order again does not restock twice
+        order.save()
+        self.tracked.refresh_from_db()
+        self.assertEqual(self.tracked.stock_quantity, 3)
+
+
+class OrderIdempotencyTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.fill_cart(2)
+
+    def place_order(self, key, address='Tashkent'):
+        return self.client.post(
+            reverse('orders:order-list-create'), {'shipping_address': address},
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_first_response(self):
+        first = self.place_order('retry-1')
+        self.assertEqual(first.status_code, 201)
+        # Replayed from the table once the cache entry is gone
+        cache.clear()
+        retry = self.place_order('retry-1')
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data['data']['order_number'], first.data['data']['order_number'])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_reused_for_another_request(self):
+        self.place_order('retry-2')
+        self.assertEqual(self.place_order('retry-2', address='Samarkand').status_code, 422)
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0)
+    def test_duplicate_of_in_flight_request(self):
+        body = json.dumps({'shipping_address': 'Tashkent'}, sort_keys=True)
+        fingerprint = hashlib.sha256(f'POST:/api/orders/:{body}'.encode()).hexdigest()
+        IdempotencyKey.objects.create(user=self.user, key='retry-3', fingerprint=fingerprint)
+
+        response = self.client.post(
+            reverse('orders:order-list-create'), {'shipping_address': 'Tashkent'},
+            format='json', HTTP_IDEMPOTENCY_KEY='retry-3',
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Order.objects.exists())
+
+    def test_cart_mutations(self):
+        for _ in range(2):
+            response = self.client.post(
+                reverse('cart'), {'product_id': self.products[4].pk, 'quantity': 1},
+                HTTP_IDEMPOTENCY_KEY='add-1',
+            )
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(CartItem.objects.get(product=self.products[4]).quantity, 1)
+
+
+class OrderHistoryTests(OrderTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        for i in range(5):
+            order = Order.objects.create(user=self.user, shipping_address='Tashkent')
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=1, price=product.price, subtotal=product.price)
+                for product in self.products[:i + 1]
+            ])
+
+    def test_pages_without_count(self):
+        url = reverse('orders:order-list-create')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'limit': 3})
+        pagination = response.data['meta']['pagination']
+        self.assertNotIn('total', pagination)
+        self.assertEqual([order['items_count'] for order in response.data['data']], [5, 4, 3])
+
+        response = self.client.get(pagination['links']['next'])
+        self.assertEqual([order['items_count'] for order in response.data['data']], [2, 1])
+        self.assertIsNone(response.data['meta']['pagination']['links']['next'])
+
+    def test_optional_total_is_cached(self):
+        url = reverse('orders:order-list-create')
+        response = self.client.get(url, {'limit': 2, 'include_total': 'true'})
+        self.assertEqual(response.data['meta']['pagination']['total'], 5)
+        with self.assertNumQueries(1):
+            self.client.get(url, {'limit': 2, 'include_total': 'true'})
+
+        Order.objects.create(user=self.user, shipping_address='Tashkent')
+        response = self.client.get(url, {'include_total': 'true'})
+        self.assertEqual(response.data['meta']['pagination']['total'], 6)
+
+
+class OrderDetailTests(OrderTestCase):
+    def test_served_from_snapshot(self):
+        self.fill_cart(5)
+        order = checkout(self.user, shipping_address='Tashkent')
+        Product.objects.filter(pk=self.products[0].pk).update(title='Renamed', price=Decimal('99.00'))
+
+        url = reverse('orders:order-detail', args=[order.pk])
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        items = response.data['data']['items']
+        self.assertEqual(len(items), 5)
+        self.assertEqual(items[0]['product']['title'], 'Product 0')
+        self.assertEqual(items[0]['price'], '10.50')
+        self.assertTrue(items[0]['product']['thumbnail'].endswith('/media/products/a.jpg'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_orders_without_snapshot_are_backfilled(self):
+        order = Order.objects.create(user=self.user, shipping_address='Tashkent')
+        OrderItem.objects.create(order=order, product=self.products[1], quantity=2, price=Decimal('9.00'))
+
+        response = self.client.get(reverse('orders:order-detail', args=[order.pk]))
+        self.assertEqual(response.data['data']['items'][0]['subtotal'], '18.00')
+        order.refresh_from_db()
+        self.assertEqual(order.items_snapshot[0]['title'], 'Product 1')
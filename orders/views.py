@@ -3,10 +3,16 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
+from django.db.models import Count
+from rest_framework.exceptions import PermissionDenied
+from config.conditional import Validators
+from config.idempotency import idempotent
 from .models import Order
 from .serializers import OrderListSerializer, OrderDetailSerializer, OrderCreateSerializer
 from .filters import OrderFilter
+from .idempotency import order_store
 from .pagination import OrderPagination
+from .services import backfill_items_snapshot
 
 
 class OrderListCreateView(generics.ListCreateAPIView):
@@ -16,7 +22,11 @@ class OrderListCreateView(generics.ListCreateAPIView):
     pagination_class = OrderPagination
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return (
+            Order.objects.filter(user=self.request.user)
+            .defer('items_snapshot')
+            .annotate(item_count=Count('items'))
+        )
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -24,46 +34,22 @@ class OrderListCreateView(generics.ListCreateAPIView):
         return OrderListSerializer
 
     def create(self, request, *args, **kwargs):
+        # Retried checkouts replay the first response instead of ordering twice
+        return idempotent(
+            request, 'orders', request.user.pk,
+            lambda: self.checkout(request), store=order_store,
+        )
+
+    def checkout(self, request):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
 
         return Response({
             'success': True,
-            'data': OrderDetailSerializer(order).data
+            'data': OrderDetailSerializer(order, context=self.get_serializer_context()).data
         }, status=status.HTTP_201_CREATED)
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        page = self.paginate_queryset(queryset)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            paginated_response = self.get_paginated_response(serializer.data)
-            return Response({
-                'success': True,
-                'data': paginated_response.data['results'],
-                'meta': {
-                    'pagination': {
-                        'total': paginated_response.data['count'],
-                        'count': len(paginated_response.data['results']),
-                        'per_page': self.pagination_class.page_size,
-                        'current_page': int(request.GET.get('page', 1)),
-                        'total_pages': paginated_response.data['count'] // self.pagination_class.page_size + 1,
-                        'links': {
-                            'next': paginated_response.data['next'],
-                            'prev': paginated_response.data['previous']
-                        }
-                    }
-                }
-            })
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({
-            'success': True,
-            'data': serializer.data
-        })
-
 
 class OrderDetailView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
@@ -71,15 +57,22 @@ class OrderDetailView(generics.RetrieveAPIView):
 
     def get_object(self):
         order = get_object_or_404(Order, id=self.kwargs['id'])
-        if order.user != self.request.user:
-            from rest_framework.exceptions import PermissionDenied
+        if order.user_id != self.request.user.pk:
             raise PermissionDenied("Not authorized to view this order")
         return order
 
     def retrieve(self, request, *args, **kwargs):
+        # Line items are a snapshot, so the order row alone decides freshness
         order = self.get_object()
+        if order.items_snapshot is None:
+            backfill_items_snapshot(order)
+        validators = Validators('order', order.pk, order.updated_at, last_modified=order.updated_at)
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+
         serializer = self.get_serializer(order)
-        return Response({
+        return validators.apply(Response({
             'success': True,
             'data': serializer.data
-        })
\ No newline at end of file
+        }))
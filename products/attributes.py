@@ -0,0 +1,74 @@
+"""
+Normalized index of ``Product.attributes`` backed by ProductAttributeValue.
+"""
+import json
+from .models import Product, ProductAttributeValue
+from .utils import chunked_ids
+
+KEY_LENGTH = ProductAttributeValue._meta.get_field('key').max_length
+VALUE_LENGTH = ProductAttributeValue._meta.get_field('value').max_length
+
+
+def normalize_value(value):
+    if isinstance(value, bool):
+        value = 'true' if value else 'false'
+    elif value is None:
+        value = 'null'
+    elif isinstance(value, dict):
+        value = json.dumps(value, sort_keys=True)
+    return str(value)[:VALUE_LENGTH]
+
+
+def attribute_pairs(attributes):
+    """Return the set of (key, value) strings indexed for an attributes dict."""
+    pairs = set()
+    if not isinstance(attributes, dict):
+        return pairs
+    for key, value in attributes.items():
+        values = value if isinstance(value, list) else [value]
+        for item in values:
+            pairs.add((str(key)[:KEY_LENGTH], normalize_value(item)))
+    return pairs
+
+
+def sync_attribute_index(product):
+    """Bring one product's index rows in line with its attributes."""
+    wanted = attribute_pairs(product.attributes)
+    rows = ProductAttributeValue.objects.filter(product=product)
+    current = {(key, value): pk for pk, key, value in rows.values_list('pk', 'key', 'value')}
+
+    stale = [pk for pair, pk in current.items() if pair not in wanted]
+    if stale:
+        ProductAttributeValue.objects.filter(pk__in=stale).delete()
+    missing = wanted - current.keys()
+    if missing:
+        ProductAttributeValue.objects.bulk_create([
+            ProductAttributeValue(product=product, key=key, value=value)
+            for key, value in missing
+        ])
+
+
+def rebuild_attribute_index(chunk_size=500):
+    """Rewrite the index for every product in chunks, yielding chunk sizes."""
+    for ids in chunked_ids(chunk_size):
+        products = Product.objects.filter(pk__in=ids).values_list('pk', 'attributes')
+        ProductAttributeValue.objects.filter(product_id__in=ids).delete()
+        ProductAttributeValue.objects.bulk_create([
+            ProductAttributeValue(product_id=pk, key=key, value=value)
+            for pk, attributes in products
+            for key, value in attribute_pairs(attributes)
+        ])
+        yield len(ids)
+
+
+def filter_by_attributes(queryset, attributes):
+    """
+    Restrict ``queryset`` to products having every given attribute. Each
+    (key, value) pair becomes an indexed ``id IN (...)`` subquery, so the
+    pairs intersect. List values require all of their elements.
+    """
+    for key, value in attribute_pairs(attributes):
+        queryset = queryset.filter(
+            pk__in=ProductAttributeValue.objects.filter(key=key, value=value).values('product_id')
+        )
+    return queryset
@@ -0,0 +1,53 @@
+"""
+Versioned response cache for anonymous catalog reads.
+
+Cached bodies are never deleted. Instead every key embeds version
+counters that are bumped from model signals, so a write makes the old
+entries unreachable and they simply age out:
+
+* ``list`` is bumped on any catalog change and guards list pages and facets.
+* ``all`` is bumped by changes that touch many detail bodies at once
+  (category edits, bulk maintenance commands).
+* one counter per product guards that product's detail body.
+
+The counters themselves are managed by ``config.cache``.
+"""
+from django.conf import settings
+from config.cache import bump_versions, canonical_query, get_versions, request_digest
+
+LIST_VERSION_KEY = 'products:version:list'
+ALL_VERSION_KEY = 'products:version:all'
+
+
+def product_version_key(pk):
+    return f'products:version:product:{pk}'
+
+
+def bump_product_versions(product_ids):
+    bump_versions([LIST_VERSION_KEY] + [product_version_key(pk) for pk in product_ids])
+
+
+def invalidate_catalog():
+    bump_versions([LIST_VERSION_KEY, ALL_VERSION_KEY])
+
+
+def list_version():
+    return get_versions([LIST_VERSION_KEY])[0]
+
+
+def list_cache_key(request, defaults=None):
+    params = canonical_query(request.query_params, defaults)
+    return f'products:list:{list_version()}:{request_digest(request, params)}'
+
+
+def detail_versions(pk):
+    return get_versions([product_version_key(pk), ALL_VERSION_KEY])
+
+
+def detail_cache_key(request, pk, versions):
+    product_version, all_version = versions
+    return f'products:detail:{pk}:{product_version}:{all_version}:{request_digest(request)}'
+
+
+def cache_timeout():
+    return settings.PRODUCT_CACHE_TIMEOUT
@@ -0,0 +1,102 @@
+"""
+Streaming catalog export (NDJSON or CSV) for feeds and search indexers.
+
+Products are walked with ``QuerySet.iterator()`` and their thumbnails are
+fetched one chunk at a time, so memory use stays flat however large the
+catalog is. Rows are produced lazily and can be written straight to a
+StreamingHttpResponse or a file.
+"""
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Product, ProductImage
+
+EXPORT_FIELDS = [
+    'id', 'title', 'description', 'price', 'category_id', 'category', 'attributes',
+    'in_stock', 'average_rating', 'reviews_count', 'likes_count', 'thumbnail',
+    'created_at', 'updated_at',
+]
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def export_queryset(updated_since=None):
+    queryset = Product.objects.select_related('category').order_by('pk')
+    if updated_since is not None:
+        queryset = queryset.filter(updated_at__gte=updated_since)
+    return queryset
+
+
+def with_thumbnails(products):
+    thumbnails = {}
+    images = ProductImage.objects.filter(
+        product_id__in=[product.pk for product in products], is_thumbnail=True
+    ).order_by('id')
+    for image in images:
+        thumbnails.setdefault(image.product_id, image)
+    for product in products:
+        yield product, thumbnails.get(product.pk)
+
+
+def iter_rows(queryset, chunk_size=1000, build_url=None):
+    """Yield one export dict per product."""
+    chunk = []
+    for product in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(product)
+        if len(chunk) >= chunk_size:
+            yield from (product_row(*pair, build_url) for pair in with_thumbnails(chunk))
+            chunk = []
+    if chunk:
+        yield from (product_row(*pair, build_url) for pair in with_thumbnails(chunk))
+
+
+def product_row(product, thumbnail, build_url=None):
+    thumbnail_url = None
+    if thumbnail:
+        thumbnail_url = build_url(thumbnail.image.url) if build_url else thumbnail.image.url
+    return {
+        'id': product.pk,
+        'title': product.title,
+        'description': product.description,
+        'price': product.price,
+        'category_id': product.category_id,
+        'category': product.category.name,
+        'attributes': product.attributes,
+        'in_stock': product.in_stock,
+        'average_rating': product.average_rating,
+        'reviews_count': product.reviews_count,
+        'likes_count': product.likes_count,
+        'thumbnail': thumbnail_url,
+        'created_at': product.created_at,
+        'updated_at': product.updated_at,
+    }
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.DictWriter(Echo(), fieldnames=EXPORT_FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        row['attributes'] = json.dumps(row['attributes'], ensure_ascii=False)
+        row['created_at'] = row['created_at'].isoformat()
+        row['updated_at'] = row['updated_at'].isoformat()
+        yield writer.writerow(row)
+
+
+def render(rows, export_format):
+    if export_format == 'csv':
+        return csv_lines(rows)
+    return ndjson_lines(rows)
@@ -0,0 +1,101 @@
+"""
+Facet counts for the product catalog.
+
+Counts are computed for an already filtered product queryset in three
+grouped aggregate queries (categories, price buckets, attributes) and can
+be cached under a key derived from the normalized filter parameters and
+the catalog list version (see products.cache).
+"""
+import hashlib
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from config.cache import canonical_query
+from .cache import list_version
+from .models import ProductAttributeValue
+
+
+def facets_cache_key(params):
+    digest = hashlib.md5(repr(canonical_query(params)).encode()).hexdigest()
+    return f'products:facets:{list_version()}:{digest}'
+
+
+def price_buckets():
+    bounds = [Decimal(str(bound)) for bound in settings.PRODUCT_FACET_PRICE_BUCKETS]
+    return [
+        (low, bounds[i + 1] if i + 1 < len(bounds) else None)
+        for i, low in enumerate(bounds)
+    ]
+
+
+def category_facets(queryset):
+    rows = (
+        queryset.order_by()
+        .values('category_id', 'category__name', 'category__slug')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'category__name')
+    )
+    return [
+        {
+            'id': row['category_id'],
+            'name': row['category__name'],
+            'slug': row['category__slug'],
+            'count': row['count'],
+        }
+        for row in rows
+    ]
+
+
+def price_facets(queryset):
+    buckets = price_buckets()
+    aggregates = {'total': Count('id')}
+    for i, (low, high) in enumerate(buckets):
+        condition = Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        aggregates[f'bucket_{i}'] = Count('id', filter=condition)
+
+    counts = queryset.order_by().aggregate(**aggregates)
+    return counts['total'], [
+        {'min': low, 'max': high, 'count': counts[f'bucket_{i}']}
+        for i, (low, high) in enumerate(buckets)
+    ]
+
+
+def attribute_facets(queryset):
+    limit = settings.PRODUCT_FACET_ATTRIBUTE_LIMIT
+    rows = (
+        ProductAttributeValue.objects
+        .filter(product__in=queryset.order_by().values('pk'))
+        .values('key', 'value')
+        .annotate(count=Count('product_id'))
+        .order_by('key', '-count', 'value')
+    )
+    facets = {}
+    for row in rows:
+        values = facets.setdefault(row['key'], [])
+        if len(values) < limit:
+            values.append({'value': row['value'], 'count': row['count']})
+    return facets
+
+
+def compute_facets(queryset, params=None):
+    timeout = settings.PRODUCT_FACETS_CACHE_TIMEOUT
+    cache_key = facets_cache_key(params) if params is not None and timeout else None
+    if cache_key:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    total, prices = price_facets(queryset)
+    facets = {
+        'total': total,
+        'categories': category_facets(queryset),
+        'price_buckets': prices,
+        'attributes': attribute_facets(queryset),
+    }
+
+    if cache_key:
+        cache.set(cache_key, facets, timeout)
+    return facets
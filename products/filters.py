@@ -1,5 +1,7 @@
 import django_filters
+from rest_framework.filters import BaseFilterBackend
 from .models import Product
+from .search import get_search_backend
 
 
 class ProductFilter(django_filters.FilterSet):
@@ -9,4 +11,16 @@ class ProductFilter(django_filters.FilterSet):
 
     class Meta:
         model = Product
-        fields = ['category', 'min_price', 'max_price']
\ No newline at end of file
+        fields = ['category', 'min_price', 'max_price']
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    Full-text ``?search=`` filter backed by products.search. Always annotates
+    ``rank`` so ``?ordering=-rank`` works with or without a search term.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        return get_search_backend().search(queryset, query)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from products.attributes import rebuild_attribute_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ProductAttributeValue index from Product.attributes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = 0
+        for count in rebuild_attribute_index(chunk_size=options['chunk_size']):
+            total += count
+            self.stdout.write(f"Indexed attributes of {total} products")
+        self.stdout.write(self.style.SUCCESS(f"Backfilled attributes for {total} products"))
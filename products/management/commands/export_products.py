@@ -0,0 +1,46 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from products import export
+
+
+class Command(BaseCommand):
+    help = "Stream the product catalog as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(export.CONTENT_TYPES), default='ndjson')
+        parser.add_argument('--output', help="File to write to (default: stdout)")
+        parser.add_argument('--updated-since', help="Only products updated at or after this ISO datetime")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--base-url', default='', help="Prefix for thumbnail URLs")
+
+    def handle(self, *args, **options):
+        updated_since = None
+        if options['updated_since']:
+            try:
+                updated_since = parse_datetime(options['updated_since'])
+            except ValueError:
+                pass
+            if updated_since is None:
+                raise CommandError("--updated-since must be an ISO 8601 datetime")
+
+        base_url = options['base_url'].rstrip('/')
+        rows = export.iter_rows(
+            export.export_queryset(updated_since),
+            chunk_size=options['chunk_size'],
+            build_url=(lambda url: base_url + url) if base_url else None,
+        )
+
+        output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        count = 0
+        try:
+            for line in export.render(rows, options['format']):
+                output.write(line)
+                count += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        if options['format'] == 'csv':
+            count -= 1
+        self.stderr.write(self.style.SUCCESS(f"Exported {count} products"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from products.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        total = 0
+        for count in backend.rebuild(chunk_size=options['chunk_size']):
+            total += count
+            self.stdout.write(f"Indexed {total} products")
+        self.stdout.write(self.style.SUCCESS(
+            f"Reindexed {total} products with {backend.__class__.__name__}"
+        ))
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAttributeValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('value', models.CharField(max_length=255)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attribute_values', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'value', 'product'], name='products_pr_key_c2e51f_idx')],
+                'unique_together': {('product', 'key', 'value')},
+            },
+        ),
+    ]
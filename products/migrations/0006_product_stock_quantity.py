@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_productattributevalue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_quantity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
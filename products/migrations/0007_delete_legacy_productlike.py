@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:49
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_stock_quantity'),
+        # Legacy likes are folded into reviews.ProductLike there first
+        ('reviews', '0003_productlike_unique_user_product'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='ProductLike',
+        ),
+    ]
@@ -16,6 +16,21 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+class ProductQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Everything ProductListSerializer reads, in a fixed number of queries."""
+        return self.select_related('category').prefetch_related(thumbnail_prefetch())
+
+
+def thumbnail_prefetch(lookup='images'):
+    """Prefetch only thumbnail images into ``<product>.thumbnails``."""
+    return models.Prefetch(
+        lookup,
+        queryset=ProductImage.objects.filter(is_thumbnail=True).order_by('id'),
+        to_attr='thumbnails',
+    )
+
+
 class Product(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -23,26 +38,75 @@ class Product(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     attributes = models.JSONField(default=dict, blank=True)
     in_stock = models.BooleanField(default=True)
+    # Units available to sell; NULL means stock is not tracked and in_stock
+    # is managed by hand. When tracked, in_stock follows the quantity.
+    stock_quantity = models.PositiveIntegerField(null=True, blank=True)
+    # Denormalized review/like aggregates, kept in sync by reviews.signals
+    # and never written by a plain save() (see saved_fields)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if self.stock_quantity is not None:
+            self.in_stock = self.stock_quantity > 0
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'stock_quantity' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'in_stock'}
+        if kwargs.get('update_fields') is None and not self._state.adding:
+            kwargs['update_fields'] = self.saved_fields()
+        super().save(*args, **kwargs)
+
+    def saved_fields(self):
+        """
+        Fields a plain save() of an existing row writes. The aggregates and
+        the stock level are moved only by F() updates (reviews.stats,
+        orders.inventory), so an instance loaded before a like, review or
+        checkout must not write its stale values back. Tracked stock also
+        owns ``in_stock``. Set stock explicitly with
+        ``save(update_fields=['stock_quantity'])`` or ``inventory.restock``.
+        """
+        skipped = {'rating_sum', 'rating_count', 'likes_count', 'stock_quantity'}
+        if self.stock_quantity is not None:
+            skipped.add('in_stock')
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.name not in skipped
+        ]
+
     @property
     def average_rating(self):
-        reviews = self.reviews.all()
-        if reviews:
-            return sum([review.rating for review in reviews]) / len(reviews)
+        if self.rating_count:
+            return self.rating_sum / self.rating_count
         return 0
 
     @property
     def reviews_count(self):
-        return self.reviews.count()
+        return self.rating_count
+
+class ProductAttributeValue(models.Model):
+    """
+    One row per (key, value) pair of ``Product.attributes``, so attribute
+    filters and facets can use btree indexes instead of JSON containment.
+    List values are expanded into one row per element.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='attribute_values')
+    key = models.CharField(max_length=100)
+    value = models.CharField(max_length=255)
 
-    @property
-    def likes_count(self):
-        return self.likes.count()
+    class Meta:
+        unique_together = ('product', 'key', 'value')
+        indexes = [models.Index(fields=['key', 'value', 'product'])]
+
+    def __str__(self):
+        return f"{self.key}={self.value}"
 
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
@@ -53,13 +117,6 @@ class ProductImage(models.Model):
     def __str__(self):
         return f"{self.product.title} - Image"
 
-class ProductLike(models.Model):
-    product = models.ForeignKey('Product', on_delete=models.CASCADE, related_name='product_likes')
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    created_at = models.DateTimeField(auto_now_add=True)
-
-
-
 class Review(models.Model):
     product = models.ForeignKey('Product', on_delete=models.CASCADE, related_name='product_reviews')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -0,0 +1,10 @@
+from rest_framework.filters import OrderingFilter
+from config.pagination import KeysetPagination
+
+
+class ProductCursorPagination(KeysetPagination):
+    """Keyset pagination over the orderings ProductListView exposes."""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = OrderingFilter().get_ordering(request, queryset, view)
+        return ordering[0] if ordering else 'created_at'
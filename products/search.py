@@ -0,0 +1,172 @@
+"""
+Full-text search backends for products.
+
+The backend is chosen from ``settings.PRODUCT_SEARCH_BACKEND`` (a dotted
+path) or, when unset, from the database vendor: a weighted ``tsvector``
+column with a GIN index on PostgreSQL, an FTS5 shadow table on SQLite and
+plain ``icontains`` matching anywhere else. Every backend annotates the
+queryset with ``rank`` (higher is more relevant).
+"""
+import re
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+from django.utils.module_loading import import_string
+from .models import Product
+from .utils import chunked_ids
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query):
+    return TERM_RE.findall(query or '')[:10]
+
+
+class BaseSearchBackend:
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def index(self, product_ids):
+        """(Re)index the given products from their current rows."""
+
+    def remove(self, product_ids):
+        """Drop the given products from the index."""
+
+    def rebuild(self, chunk_size=500):
+        """Reindex every product in chunks, yielding the size of each chunk."""
+        for ids in chunked_ids(chunk_size):
+            self.index(ids)
+            yield len(ids)
+
+    def unranked(self, queryset):
+        return queryset.annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """LIKE matching on title and description; no index, no ranking."""
+
+    def search(self, queryset, query):
+        for term in search_terms(query):
+            queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+        return self.unranked(queryset)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Weighted ``search_vector`` tsvector column with a GIN index."""
+
+    def __init__(self):
+        self.config = getattr(settings, 'PRODUCT_SEARCH_CONFIG', 'simple')
+        self.table = connection.ops.quote_name(Product._meta.db_table)
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return self.unranked(queryset)
+
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        params = (self.config, tsquery)
+        # Neither piece names the outer table: Django aliases it when the
+        # queryset is nested (facets filter on ``pk__in=<search>``), and a
+        # qualified column would then point at a table not in scope.
+        # search_vector exists only on the product table, so the bare
+        # column in the rank is unambiguous.
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT id FROM {self.table} WHERE search_vector @@ to_tsquery(%s, %s)", params
+            )
+        ).annotate(
+            # ts_rank() is float4; widen it so keyset cursors, which carry
+            # the rank as a JSON double, compare equal at page boundaries
+            rank=Cast(
+                RawSQL(
+                    "ts_rank(search_vector, to_tsquery(%s, %s))", params,
+                    output_field=FloatField(),
+                ),
+                output_field=FloatField(),
+            )
+        )
+
+    def index(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {self.table} SET search_vector = "
+                f"setweight(to_tsvector(%s, coalesce(title, '')), 'A') || "
+                f"setweight(to_tsvector(%s, coalesce(description, '')), 'B') "
+                f"WHERE id = ANY(%s)",
+                [self.config, self.config, list(product_ids)],
+            )
+
+    # The vector lives on the product row itself, so deletes need no work
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """FTS5 virtual table ``products_product_fts`` keyed by product id."""
+    fts_table = 'products_product_fts'
+
+    def __init__(self):
+        self.table = connection.ops.quote_name(Product._meta.db_table)
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return self.unranked(queryset)
+
+        match = ' '.join(f'"{term}"*' for term in terms)
+        fts = self.fts_table
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", (match,))
+        ).annotate(
+            # bm25() is lower-is-better; negate it so rank sorts like ts_rank
+            rank=RawSQL(
+                f"SELECT -bm25({fts}, 10.0, 1.0) FROM {fts} "
+                f"WHERE {fts} MATCH %s AND rowid = {self.table}.id",
+                (match,), output_field=FloatField(),
+            )
+        )
+
+    def index(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.fts_table} WHERE rowid IN ({placeholders})", product_ids
+            )
+            cursor.execute(
+                f"INSERT INTO {self.fts_table} (rowid, title, description) "
+                f"SELECT id, title, description FROM {self.table} WHERE id IN ({placeholders})",
+                product_ids,
+            )
+
+    def remove(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.fts_table} WHERE rowid IN ({placeholders})", product_ids
+            )
+
+
+VENDOR_BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+        if path:
+            backend_class = import_string(path)
+        else:
+            backend_class = VENDOR_BACKENDS.get(connection.vendor, SimpleSearchBackend)
+        _backend = backend_class()
+    return _backend
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Product, Category, ProductImage, Review, ProductLike
+from reviews.services import liked_product_ids
+from .models import Product, Category, ProductImage, Review
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -11,23 +12,40 @@ class ProductImageSerializer(serializers.ModelSerializer):
         model = ProductImage
         fields = ['image']
 
-class ProductListSerializer(serializers.ModelSerializer):
+class LikedMixin:
+    def get_is_liked(self, obj):
+        # One cached set per request instead of a query per product; callers
+        # may also pass their own ``liked_ids`` in the context
+        liked_ids = self.context.get('liked_ids')
+        if liked_ids is None:
+            request = self.context.get('request')
+            liked_ids = liked_product_ids(request.user) if request else frozenset()
+            self.context['liked_ids'] = liked_ids
+        return obj.pk in liked_ids
+
+class ProductListSerializer(LikedMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     thumbnail = serializers.SerializerMethodField()
     average_rating = serializers.ReadOnlyField()
     likes_count = serializers.ReadOnlyField()
+    is_liked = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        fields = ['id', 'title', 'price', 'thumbnail', 'category', 'average_rating', 'likes_count']
+        fields = ['id', 'title', 'price', 'thumbnail', 'category', 'average_rating', 'likes_count',
+                  'is_liked']
 
     def get_thumbnail(self, obj):
-        thumbnail = obj.images.filter(is_thumbnail=True).first()
+        thumbnails = getattr(obj, 'thumbnails', None)
+        if thumbnails is None:
+            thumbnail = obj.images.filter(is_thumbnail=True).first()
+        else:
+            thumbnail = thumbnails[0] if thumbnails else None
         if thumbnail:
             return self.context['request'].build_absolute_uri(thumbnail.image.url)
         return None
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(LikedMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     images = serializers.SerializerMethodField()
     average_rating = serializers.ReadOnlyField()
@@ -45,12 +63,6 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         images = obj.images.all()
         return [self.context['request'].build_absolute_uri(img.image.url) for img in images]
 
-    def get_is_liked(self, obj):
-        user = self.context['request'].user
-        if user.is_authenticated:
-            return ProductLike.objects.filter(product=obj, user=user).exists()
-        return False
-
 class ReviewSerializer(serializers.ModelSerializer):
     user = serializers.SerializerMethodField()
 
@@ -0,0 +1,45 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Category, Product, ProductImage
+from .attributes import sync_attribute_index
+from .cache import bump_product_versions, invalidate_catalog
+from .search import get_search_backend
+
+SEARCH_FIELDS = {'title', 'description'}
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        get_search_backend().index([instance.pk])
+    if update_fields is None or 'attributes' in update_fields:
+        sync_attribute_index(instance)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product(sender, instance, **kwargs):
+    bump_product_versions([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def product_image_changed(sender, instance, **kwargs):
+    # Images are part of the product body; keep Last-Modified honest
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender='reviews.Review')
+@receiver([post_save, post_delete], sender='reviews.ProductLike')
+def invalidate_related_product(sender, instance, **kwargs):
+    bump_product_versions([instance.product_id])
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category(sender, instance, **kwargs):
+    invalidate_catalog()
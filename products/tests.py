@@ -1,3 +1,341 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from . import export
+from .models import Category, Product, ProductAttributeValue, ProductImage
+from .search import PostgresSearchBackend
+from .throttling import ProductExportThrottle
 
-# Create your tests here.
+
+class ProductListQueryCountTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Phones', slug='phones')
+
+    def create_products(self, count):
+        for i in range(count):
+            product = Product.objects.create(
+                title=f'Product {i}', description='...', price=10 + i,
+                category=self.category,
+            )
+            ProductImage.objects.create(product=product, image='products/a.jpg', is_thumbnail=True)
+            ProductImage.objects.create(product=product, image='products/b.jpg')
+
+    def test_query_count_does_not_grow_with_results(self):
+        self.create_products(2)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('product-list'))
+        self.assertEqual(response.status_code, 200)
+
+        self.create_products(15)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('product-list'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_thumbnail_comes_from_prefetch(self):
+        self.create_products(1)
+        response = self.client.get(reverse('product-list'))
+        item = response.data['data'][0]
+        self.assertTrue(item['thumbnail'].endswith('/media/products/a.jpg'))
+        self.assertEqual(item['category']['slug'], 'phones')
+
+
+class ProductCursorPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='Phones', slug='phones')
+        # Repeated prices force the id tie-breaker to matter
+        self.products = [
+            Product.objects.create(title=f'P{i}', description='...', price=i % 3, category=category)
+            for i in range(7)
+        ]
+
+    def collect(self, url):
+        ids, prev_url = [], None
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.data['data'])
+            links = response.data['meta']['pagination']['links']
+            url, prev_url = links['next'], links['prev']
+        return ids, prev_url
+
+    def test_walks_price_ordering_without_gaps_or_duplicates(self):
+        expected = [p.id for p in sorted(self.products, key=lambda p: (p.price, p.id), reverse=True)]
+        ids, prev_url = self.collect(reverse('product-list') + '?ordering=-price&limit=3')
+        self.assertEqual(ids, expected)
+
+        response = self.client.get(prev_url)
+        self.assertEqual([item['id'] for item in response.data['data']], expected[3:6])
+
+    def test_walks_rank_ordering_across_ties(self):
+        category = self.products[0].category
+        # Identical rows share a rank, so page boundaries fall inside ties
+        for title, description, copies in (
+            ('Galaxy phone', 'galaxy galaxy', 3),
+            ('Galaxy case', 'Silicone', 3),
+            ('Phone stand', 'Holds a galaxy', 2),
+        ):
+            for _ in range(copies):
+                Product.objects.create(title=title, description=description, price=1, category=category)
+
+        url = reverse('product-list') + '?search=galaxy&ordering=-rank'
+        expected = [item['id'] for item in self.client.get(url + '&limit=100').data['data']]
+        self.assertEqual(len(expected), 8)
+
+        ids, prev_url = self.collect(url + '&limit=2')
+        self.assertEqual(ids, expected)
+        response = self.client.get(prev_url)
+        self.assertEqual([item['id'] for item in response.data['data']], expected[4:6])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('product-list') + '?cursor=bogus')
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='Phones', slug='phones')
+        self.title_hit = Product.objects.create(
+            title='Galaxy phone', description='Android handset', price=100, category=category,
+        )
+        self.body_hit = Product.objects.create(
+            title='Phone case', description='Fits the galaxy range', price=10, category=category,
+        )
+        Product.objects.create(title='Laptop', description='Notebook', price=900, category=category)
+
+    def search(self, query, ordering='-rank'):
+        response = self.client.get(reverse('product-list'), {'search': query, 'ordering': ordering})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['data']]
+
+    def test_prefix_match_ranked_by_relevance(self):
+        self.assertEqual(self.search('gala'), [self.title_hit.id, self.body_hit.id])
+
+    def test_index_follows_save_and_delete(self):
+        self.body_hit.description = 'Silicone'
+        self.body_hit.save()
+        self.assertEqual(self.search('galaxy'), [self.title_hit.id])
+
+        self.title_hit.delete()
+        self.assertEqual(self.search('galaxy'), [])
+
+
+class ProductAttributeFilterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='Phones', slug='phones')
+        self.red = Product.objects.create(
+            title='Red', description='...', price=1, category=category,
+            attributes={'color': 'red', 'sizes': ['s', 'm'], 'wireless': True},
+        )
+        self.blue = Product.objects.create(
+            title='Blue', description='...', price=1, category=category,
+            attributes={'color': 'blue', 'sizes': ['m']},
+        )
+
+    def filter_ids(self, attributes):
+        response = self.client.get(reverse('product-list'), {'attributes': json.dumps(attributes)})
+        return {item['id'] for item in response.data['data']}
+
+    def test_pairs_intersect(self):
+        self.assertEqual(self.filter_ids({'sizes': 'm'}), {self.red.id, self.blue.id})
+        self.assertEqual(self.filter_ids({'sizes': 'm', 'color': 'red'}), {self.red.id})
+        self.assertEqual(self.filter_ids({'wireless': True}), {self.red.id})
+
+    def test_index_follows_attribute_changes(self):
+        self.blue.attributes = {'color': 'red'}
+        self.blue.save()
+        self.assertEqual(self.filter_ids({'color': 'red'}), {self.red.id, self.blue.id})
+        self.assertEqual(self.filter_ids({'sizes': 'm'}), {self.red.id})
+
+
+@override_settings(PRODUCT_FACET_PRICE_BUCKETS=[0, 50, 100], PRODUCT_FACETS_CACHE_TIMEOUT=0)
+class ProductFacetsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.phones = Category.objects.create(name='Phones', slug='phones')
+        cases = Category.objects.create(name='Cases', slug='cases')
+        Product.objects.create(title='Phone A', description='...', price=80, category=self.phones,
+                               attributes={'color': 'red'})
+        Product.objects.create(title='Phone B', description='...', price=120, category=self.phones,
+                               attributes={'color': 'blue'})
+        Product.objects.create(title='Case', description='...', price=10, category=cases,
+                               attributes={'color': 'red'})
+
+    def test_counts_follow_filters_in_fixed_queries(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('product-facets'), {'max_price': 100})
+        data = response.data['data']
+
+        self.assertEqual(data['total'], 2)
+        self.assertEqual([(c['slug'], c['count']) for c in data['categories']],
+                         [('cases', 1), ('phones', 1)])
+        self.assertEqual([b['count'] for b in data['price_buckets']], [1, 1, 0])
+        self.assertEqual(data['attributes'], {'color': [{'value': 'red', 'count': 2}]})
+
+    def test_search_query_nested_in_facets(self):
+        response = self.client.get(reverse('product-facets'), {'search': 'phone'})
+        self.assertEqual(response.status_code, 200)
+        data = response.data['data']
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(data['attributes'], {'color': [
+            {'value': 'blue', 'count': 1}, {'value': 'red', 'count': 1},
+        ]})
+
+    def test_postgres_search_is_valid_as_a_subquery(self):
+        # Nested, the product table is aliased (U0): raw SQL must not name it
+        queryset = PostgresSearchBackend().search(Product.objects.all(), 'phone')
+        sql = str(ProductAttributeValue.objects.filter(product__in=queryset.order_by().values('pk')).query)
+        self.assertIn('search_vector @@', sql)
+        self.assertNotIn('.search_vector', sql)
+        self.assertNotIn('."search_vector"', sql)
+
+
+class ProductResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name='Phones', slug='phones')
+        self.product = Product.objects.create(title='Phone', description='...', price=1, category=category)
+
+    def test_anonymous_list_is_served_from_cache_until_a_write(self):
+        url = reverse('product-list')
+        self.client.get(url, {'ordering': 'created_at'})
+        with self.assertNumQueries(0):
+            # Same canonical query: default ordering dropped
+            self.client.get(url)
+
+        self.product.title = 'Renamed'
+        self.product.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data['data'][0]['title'], 'Renamed')
+
+    def test_detail_is_invalidated_by_related_writes(self):
+        url = reverse('product-detail', args=[self.product.pk])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        ProductImage.objects.create(product=self.product, image='products/a.jpg')
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['images']), 1)
+
+    def test_detail_conditional_get(self):
+        url = reverse('product-detail', args=[self.product.pk])
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        self.product.price = 2
+        self.product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ProductBatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='Phones', slug='phones')
+        self.products = [
+            Product.objects.create(title=f'P{i}', description='...', price=1, category=category)
+            for i in range(4)
+        ]
+        for product in self.products:
+            ProductImage.objects.create(product=product, image='products/a.jpg', is_thumbnail=True)
+
+    def test_preserves_order_and_reports_missing(self):
+        ids = [self.products[2].pk, 999999, self.products[0].pk]
+        for shape, queries in (('list', 2), ('detail', 2)):
+            with self.assertNumQueries(queries):
+                response = self.client.get(reverse('product-batch'), {
+                    'ids': ','.join(map(str, ids)), 'shape': shape,
+                })
+            self.assertEqual([item['id'] for item in response.data['data']], [ids[0], ids[2]])
+            self.assertEqual(response.data['meta']['missing'], [999999])
+
+    @override_settings(PRODUCT_BATCH_MAX_IDS=2)
+    def test_rejects_too_many_ids(self):
+        response = self.client.get(reverse('product-batch'), {'ids': '1,2,3'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ProductExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name='Phones', slug='phones')
+        self.products = [
+            Product.objects.create(title=f'P{i}', description='...', price=i, category=category,
+                                   attributes={'color': 'red'})
+            for i in range(5)
+        ]
+        ProductImage.objects.create(product=self.products[0], image='products/a.jpg', is_thumbnail=True)
+
+    def export(self, **params):
+        response = self.client.get(reverse('product-export'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [p.pk for p in self.products])
+        self.assertEqual(rows[0]['thumbnail'], 'http://testserver/media/products/a.jpg')
+        self.assertEqual((rows[0]['category'], rows[0]['attributes']), ('Phones', {'color': 'red'}))
+        self.assertIsNone(rows[1]['thumbnail'])
+
+    def test_csv(self):
+        rows = list(csv.DictReader(StringIO(self.export(export_format='csv'))))
+        self.assertEqual([int(row['id']) for row in rows], [p.pk for p in self.products])
+        self.assertEqual(json.loads(rows[0]['attributes']), {'color': 'red'})
+
+    def test_updated_since(self):
+        cutoff = timezone.now() - timedelta(hours=1)
+        Product.objects.filter(pk__in=[p.pk for p in self.products[1:]]).update(
+            updated_at=cutoff - timedelta(days=1)
+        )
+        lines = self.export(updated_since=cutoff.isoformat()).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [self.products[0].pk])
+
+    def test_rejects_bad_parameters(self):
+        for params in ({'export_format': 'xml'}, {'updated_since': 'yesterday'}):
+            response = self.client.get(reverse('product-export'), params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_one_thumbnail_query_per_chunk(self):
+        # The product scan, then one thumbnail query per chunk of two
+        with self.assertNumQueries(4):
+            rows = list(export.iter_rows(export.export_queryset(), chunk_size=2))
+        self.assertEqual(len(rows), 5)
+
+    def test_throttled(self):
+        limit, _ = ProductExportThrottle().parse_rate(ProductExportThrottle().get_rate())
+        for _ in range(limit):
+            self.export()
+        response = self.client.get(reverse('product-export'))
+        self.assertEqual(response.status_code, 429)
+
+    def test_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'products.csv')
+            stderr = StringIO()
+            call_command('export_products', '--format', 'csv', '--output', path, stderr=stderr)
+            with open(path, encoding='utf-8', newline='') as f:
+                self.assertEqual(len(list(csv.DictReader(f))), 5)
+        self.assertIn('Exported 5 products', stderr.getvalue())
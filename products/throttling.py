@@ -0,0 +1,6 @@
+from rest_framework.throttling import UserRateThrottle
+
+
+class ProductExportThrottle(UserRateThrottle):
+    """Per user (or per IP when anonymous) limit on full catalog exports."""
+    scope = 'product_export'
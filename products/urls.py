@@ -3,6 +3,9 @@
 from django.urls import path
 from .views import (
     ProductListView,
+    ProductFacetsView,
+    ProductBatchView,
+    export_products,
     ProductDetailView,
     like_product,
     create_review,
@@ -10,6 +13,9 @@ from .views import (
 
 urlpatterns = [
     path('', ProductListView.as_view(), name='product-list'),
+    path('facets/', ProductFacetsView.as_view(), name='product-facets'),
+    path('batch/', ProductBatchView.as_view(), name='product-batch'),
+    path('export/', export_products, name='product-export'),
     path('<int:pk>/', ProductDetailView.as_view(), name='product-detail'),
     path('<int:pk>/like/', like_product, name='product-like'),
     path('<int:pk>/review/', create_review, name='product-review'),
@@ -0,0 +1,18 @@
+from .models import Product
+
+
+def chunked_ids(chunk_size, queryset=None):
+    """Yield lists of product ids in primary key order without OFFSET."""
+    if queryset is None:
+        queryset = Product.objects.all()
+    last_id = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_id)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
@@ -1,29 +1,37 @@
 from rest_framework import generics, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Q
+from django.http import Http404, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
 import json
-from .models import Product, ProductLike, Review
+from config.conditional import Validators
+from reviews.services import liked_product_ids, toggle_like
+from .models import Product, Review
 from .serializers import (
     ProductListSerializer, ProductDetailSerializer,
     ReviewSerializer, CreateReviewSerializer
 )
-from .filters import ProductFilter
-from orders.models import OrderItem
+from .attributes import filter_by_attributes
+from . import export
+from .cache import cache_timeout, detail_cache_key, detail_versions, list_cache_key
+from .facets import compute_facets
+from .filters import ProductFilter, ProductSearchFilter
+from .pagination import ProductCursorPagination
+from .throttling import ProductExportThrottle
+from orders.purchases import has_purchased
 
 
-class ProductListView(generics.ListAPIView):
-    queryset = Product.objects.all()
-    serializer_class = ProductListSerializer
+class ProductFilterMixin:
+    """Catalog filters shared by the product list and facet endpoints."""
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter]
     filterset_class = ProductFilter
-    search_fields = ['title', 'description']
-    ordering_fields = ['price', 'created_at', 'title']
-    ordering = ['created_at']
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -43,48 +51,163 @@ class ProductListView(generics.ListAPIView):
         if attributes:
             try:
                 attr_dict = json.loads(attributes)
-                for key, value in attr_dict.items():
-                    queryset = queryset.filter(attributes__contains={key: value})
+                queryset = filter_by_attributes(queryset, attr_dict)
             except json.JSONDecodeError:
                 pass
 
         return queryset
 
 
-class ProductDetailView(generics.RetrieveAPIView):
+class ProductListView(ProductFilterMixin, generics.ListAPIView):
+    queryset = Product.objects.for_listing()
+    serializer_class = ProductListSerializer
+    filter_backends = ProductFilterMixin.filter_backends + [OrderingFilter]
+    pagination_class = ProductCursorPagination
+    ordering_fields = ['price', 'created_at', 'title', 'rank']
+    ordering = ['created_at']
+    cache_defaults = {'ordering': 'created_at', 'limit': str(ProductCursorPagination.page_size)}
+
+    def list(self, request, *args, **kwargs):
+        # Anonymous pages are identical for everyone, so they are cached
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+
+        cache_key = list_cache_key(request, self.cache_defaults)
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(cache_key, response.data, cache_timeout())
+        return response
+
+
+class ProductFacetsView(ProductFilterMixin, generics.GenericAPIView):
     queryset = Product.objects.all()
-    serializer_class = ProductDetailSerializer
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response({
+            'success': True,
+            'data': compute_facets(queryset, request.query_params)
+        })
+
+
+class ProductBatchView(generics.GenericAPIView):
+    """
+    ``GET /api/products/batch/?ids=3,1,2[&shape=detail]``: several products
+    in one request and a fixed number of queries, in the requested order.
+    Unknown ids are reported in ``meta.missing``.
+    """
     permission_classes = [AllowAny]
 
+    def get_queryset(self):
+        if self.request.query_params.get('shape') == 'detail':
+            return Product.objects.select_related('category').prefetch_related('images')
+        return Product.objects.for_listing()
 
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def like_product(request, pk):
-    try:
-        product = Product.objects.get(pk=pk)
-        like, created = ProductLike.objects.get_or_create(
-            product=product, user=request.user
-        )
+    def get_serializer_class(self):
+        if self.request.query_params.get('shape') == 'detail':
+            return ProductDetailSerializer
+        return ProductListSerializer
 
-        if not created:
-            like.delete()
-            liked = False
-        else:
-            liked = True
+    def get(self, request, *args, **kwargs):
+        try:
+            ids = [int(pk) for pk in request.query_params.get('ids', '').split(',') if pk.strip()]
+        except ValueError:
+            ids = None
+        if not ids:
+            return Response({
+                'success': False,
+                'error': {'message': 'ids must be a comma-separated list of product ids'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = list(dict.fromkeys(ids))
+        max_ids = settings.PRODUCT_BATCH_MAX_IDS
+        if len(ids) > max_ids:
+            return Response({
+                'success': False,
+                'error': {'message': f'At most {max_ids} ids can be requested at once'}
+            }, status=status.HTTP_400_BAD_REQUEST)
 
+        products = self.get_queryset().in_bulk(ids)
+        context = self.get_serializer_context()
+        context['liked_ids'] = liked_product_ids(request.user)
+
+        serializer = self.get_serializer_class()(
+            [products[pk] for pk in ids if pk in products], many=True, context=context
+        )
         return Response({
             'success': True,
-            'data': {
-                'liked': liked,
-                'likes_count': product.likes_count
+            'data': serializer.data,
+            'meta': {
+                'missing': [pk for pk in ids if pk not in products]
             }
         })
-    except Product.DoesNotExist:
+
+
+class ProductDetailView(generics.RetrieveAPIView):
+    queryset = Product.objects.select_related('category').prefetch_related('images')
+    serializer_class = ProductDetailSerializer
+    permission_classes = [AllowAny]
+
+    def get_last_modified(self, pk):
+        timestamps = (
+            Product.objects.filter(pk=pk)
+            .values_list('updated_at', 'category__updated_at')
+            .first()
+        )
+        if timestamps is None:
+            raise Http404
+        return max(timestamps)
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = self.kwargs['pk']
+        versions = detail_versions(pk)
+        cache_key = detail_cache_key(request, pk, versions)
+        entry = cache.get(cache_key)
+
+        last_modified = entry['last_modified'] if entry else self.get_last_modified(pk)
+        # The user is part of the tag because is_liked differs per user
+        validators = Validators('product', pk, *versions, request.user.pk, last_modified=last_modified)
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+
+        if entry is None:
+            data = self.get_serializer(self.get_object()).data
+            # The cached body is shared, so it carries no per-user state
+            cache.set(cache_key, {
+                'data': {**data, 'is_liked': False},
+                'last_modified': last_modified,
+            }, cache_timeout())
+        else:
+            data = entry['data']
+            if request.user.is_authenticated:
+                data = {**data, 'is_liked': int(pk) in liked_product_ids(request.user)}
+
+        return validators.apply(Response(data))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def like_product(request, pk):
+    if not Product.objects.filter(pk=pk).exists():
         return Response({
             'success': False,
             'error': {'message': 'Product not found'}
         }, status=status.HTTP_404_NOT_FOUND)
 
+    liked, likes_count = toggle_like(request.user, pk)
+    return Response({
+        'success': True,
+        'data': {
+            'liked': liked,
+            'likes_count': likes_count
+        }
+    })
+
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -93,13 +216,7 @@ def create_review(request, pk):
         product = Product.objects.get(pk=pk)
 
         # Check if user has ordered this product
-        has_ordered = OrderItem.objects.filter(
-            order__user=request.user,
-            product=product,
-            order__status='delivered'
-        ).exists()
-
-        if not has_ordered:
+        if not has_purchased(request.user, product.pk):
             return Response({
                 'success': False,
                 'error': {'message': 'You can only review products you have purchased'}
@@ -129,4 +246,45 @@ def create_review(request, pk):
         return Response({
             'success': False,
             'error': {'message': 'Product not found'}
-        }, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        }, status=status.HTTP_404_NOT_FOUND)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@throttle_classes([ProductExportThrottle])
+def export_products(request):
+    """
+    Stream the whole catalog, or rows changed since ``updated_since``, as
+    NDJSON (default) or CSV (``export_format=csv``). Throttled per client
+    under the ``product_export`` rate.
+    """
+    export_format = request.query_params.get('export_format', 'ndjson')
+    if export_format not in export.CONTENT_TYPES:
+        return Response({
+            'success': False,
+            'error': {'message': 'export_format must be one of: ndjson, csv'}
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    updated_since = request.query_params.get('updated_since')
+    if updated_since:
+        try:
+            updated_since = parse_datetime(updated_since)
+        except ValueError:
+            updated_since = None
+        if updated_since is None:
+            return Response({
+                'success': False,
+                'error': {'message': 'updated_since must be an ISO 8601 datetime'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = export.iter_rows(
+        export.export_queryset(updated_since or None),
+        chunk_size=settings.PRODUCT_EXPORT_CHUNK_SIZE,
+        build_url=request.build_absolute_uri,
+    )
+    response = StreamingHttpResponse(
+        export.render(rows, export_format),
+        content_type=export.CONTENT_TYPES[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="products.{export_format}"'
+    return response
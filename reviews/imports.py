@@ -0,0 +1,171 @@
+"""
+Bulk review import.
+
+Rows (``product_id``, ``user_id``, ``rating``, optional ``comment`` and
+``created_at``) are streamed from JSONL or CSV and handled in batches:
+product and user ids are checked with one query each, pairs that already
+have a review are skipped, and the rest go in with one ``bulk_create``.
+``created_at`` values from the file are written afterwards with one
+``bulk_update``, since ``auto_now_add`` overrides them on insert.
+``bulk_create`` skips the review signals, so rating aggregates and
+histograms are recomputed once per touched product at the end, even when
+a batch fails part way through.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from products.cache import invalidate_catalog
+from products.models import Product
+from .models import Review
+from .stats import recompute_product_stats
+
+FORMATS = ('jsonl', 'csv')
+MAX_REPORTED_ERRORS = 100
+User = get_user_model()
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    errors: list = field(default_factory=list)
+    product_ids: set = field(default_factory=set)
+
+    def reject(self, line_number, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+
+def read_rows(file, file_format):
+    """Yield ``(line_number, row dict)`` pairs from a JSONL or CSV file."""
+    if file_format == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError:
+            yield line_number, None
+
+
+def parse_row(row):
+    if not isinstance(row, dict):
+        raise InvalidRow("not a JSON object")
+    try:
+        product_id = int(row['product_id'])
+        user_id = int(row['user_id'])
+        rating = int(row['rating'])
+    except KeyError as exc:
+        raise InvalidRow(f"missing {exc.args[0]}")
+    except (TypeError, ValueError):
+        raise InvalidRow("product_id, user_id and rating must be integers")
+    if not 1 <= rating <= 5:
+        raise InvalidRow("rating must be between 1 and 5")
+
+    created_at = row.get('created_at') or None
+    if created_at is not None:
+        try:
+            created_at = parse_datetime(created_at)
+        except (TypeError, ValueError):
+            created_at = None
+        if created_at is None:
+            raise InvalidRow("created_at must be an ISO 8601 datetime")
+        if timezone.is_naive(created_at):
+            created_at = timezone.make_aware(created_at)
+
+    return Review(
+        product_id=product_id, user_id=user_id, rating=rating,
+        comment=row.get('comment') or '', created_at=created_at,
+    )
+
+
+def import_batch(rows, stats, seen, batch_size):
+    reviews = []
+    for line_number, row in rows:
+        stats.read += 1
+        try:
+            reviews.append((line_number, parse_row(row)))
+        except InvalidRow as exc:
+            stats.reject(line_number, str(exc))
+
+    product_ids = set(
+        Product.objects.filter(pk__in={r.product_id for _, r in reviews}).values_list('pk', flat=True)
+    )
+    user_ids = set(
+        User.objects.filter(pk__in={r.user_id for _, r in reviews}).values_list('pk', flat=True)
+    )
+    valid = []
+    for line_number, review in reviews:
+        if review.product_id not in product_ids:
+            stats.reject(line_number, f"unknown product {review.product_id}")
+        elif review.user_id not in user_ids:
+            stats.reject(line_number, f"unknown user {review.user_id}")
+        else:
+            valid.append(review)
+
+    existing = set(
+        Review.objects.filter(
+            product_id__in={r.product_id for r in valid}, user_id__in={r.user_id for r in valid}
+        ).values_list('user_id', 'product_id')
+    )
+    fresh = []
+    for review in valid:
+        pair = (review.user_id, review.product_id)
+        if pair in existing or pair in seen:
+            stats.duplicates += 1
+            continue
+        seen.add(pair)
+        fresh.append(review)
+
+    imported_at = [(review, review.created_at) for review in fresh if review.created_at]
+    with transaction.atomic():
+        Review.objects.bulk_create(fresh, batch_size=batch_size)
+        for review, created_at in imported_at:
+            review.created_at = created_at
+        Review.objects.bulk_update(
+            [review for review, _ in imported_at], ['created_at'], batch_size=batch_size
+        )
+    stats.imported += len(fresh)
+    stats.product_ids.update(review.product_id for review in fresh)
+
+
+def import_reviews(rows, batch_size=1000, progress=None):
+    """
+    Import ``(line_number, row)`` pairs from ``read_rows``; ``progress`` is
+    called with the running ImportStats after every batch.
+    """
+    stats = ImportStats()
+    seen = set()
+    rows = iter(rows)
+    try:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            import_batch(batch, stats, seen, batch_size)
+            if progress:
+                progress(stats)
+    finally:
+        # Batches are committed one by one; whatever went in gets its stats
+        product_ids = sorted(stats.product_ids)
+        for start in range(0, len(product_ids), batch_size):
+            recompute_product_stats(product_ids[start:start + batch_size])
+        if product_ids:
+            invalidate_catalog()
+    return stats
@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from reviews.imports import FORMATS, import_reviews, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import reviews from a JSONL or CSV file, skipping (user, product) duplicates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or - for stdin")
+        parser.add_argument('--format', choices=FORMATS, help="Default: from the file extension")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format']
+        if file_format is None:
+            extension = os.path.splitext(path)[1].lstrip('.').lower()
+            file_format = 'jsonl' if extension in ('jsonl', 'ndjson', 'json') else extension
+        if file_format not in FORMATS:
+            raise CommandError("Cannot tell the file format; pass --format jsonl or --format csv")
+
+        started = time.monotonic()
+
+        def progress(stats):
+            rate = stats.read / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f"Read {stats.read} rows: {stats.imported} imported, {stats.duplicates} duplicates, "
+                f"{stats.invalid} invalid ({rate:.0f} rows/s)"
+            )
+
+        if path == '-':
+            stats = import_reviews(read_rows(sys.stdin, file_format), options['batch_size'], progress)
+        else:
+            try:
+                file = open(path, encoding='utf-8', newline='')
+            except OSError as exc:
+                raise CommandError(f"Cannot open {path}: {exc}")
+            with file:
+                stats = import_reviews(read_rows(file, file_format), options['batch_size'], progress)
+
+        for line_number, message in stats.errors:
+            self.stderr.write(f"Line {line_number}: {message}")
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats.imported} reviews for {len(stats.product_ids)} products in {elapsed:.1f}s "
+            f"({stats.duplicates} duplicates and {stats.invalid} invalid rows skipped)"
+        ))
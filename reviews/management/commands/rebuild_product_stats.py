@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from products.cache import invalidate_catalog
+from reviews.stats import recompute_product_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild Product rating_sum, rating_count and likes_count from reviews and likes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'product_ids', nargs='*', type=int,
+            help="Only rebuild these products (default: all)",
+        )
+
+    def handle(self, *args, **options):
+        product_ids = options['product_ids'] or None
+        updated = recompute_product_stats(product_ids)
+        invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats; {updated} products had drifted and were corrected"))
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q
+
+
+def backfill_rating_histograms(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    RatingHistogram = apps.get_model('reviews', 'RatingHistogram')
+    counts = Review.objects.order_by().values('product').annotate(**{
+        f'rating_{rating}': Count('id', filter=Q(rating=rating)) for rating in range(1, 6)
+    })
+    RatingHistogram.objects.bulk_create(
+        [RatingHistogram(product_id=row.pop('product'), **row) for row in counts.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_stock_quantity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingHistogram',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_histogram', serialize=False, to='products.product')),
+                ('rating_1', models.PositiveIntegerField(default=0)),
+                ('rating_2', models.PositiveIntegerField(default=0)),
+                ('rating_3', models.PositiveIntegerField(default=0)),
+                ('rating_4', models.PositiveIntegerField(default=0)),
+                ('rating_5', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='productlike',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='likes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', 'created_at'], name='reviews_rev_product_847b15_idx'),
+        ),
+        migrations.RunPython(backfill_rating_histograms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:30
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def merge_likes(apps, schema_editor):
+    """
+    Drop duplicate likes, fold in the likes recorded by the legacy
+    products.ProductLike model and recount Product.likes_count.
+    """
+    ProductLike = apps.get_model('reviews', 'ProductLike')
+    LegacyProductLike = apps.get_model('products', 'ProductLike')
+    Product = apps.get_model('products', 'Product')
+
+    keep = (
+        ProductLike.objects.filter(user__isnull=False)
+        .values('user', 'product').annotate(first=Min('id')).values('first')
+    )
+    ProductLike.objects.filter(user__isnull=False).exclude(id__in=keep).delete()
+
+    existing = set(
+        ProductLike.objects.filter(user__isnull=False).values_list('user_id', 'product_id')
+    )
+    ProductLike.objects.bulk_create(
+        [
+            ProductLike(user_id=user_id, product_id=product_id)
+            for user_id, product_id in LegacyProductLike.objects.values_list('user_id', 'product_id').distinct()
+            if (user_id, product_id) not in existing
+        ],
+        batch_size=1000,
+    )
+
+    likes = ProductLike.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    Product.objects.update(
+        likes_count=Coalesce(Subquery(likes.annotate(total=Count('id')).values('total')), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_review_user_rating_histogram'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_likes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='productlike',
+            constraint=models.UniqueConstraint(fields=('user', 'product'), name='reviews_productlike_unique_user_product'),
+        ),
+    ]
@@ -8,6 +8,7 @@ User = get_user_model()
 class Review(models.Model):
     product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='review_reviews')
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reviews', null=True)
     rating = models.IntegerField(
         validators=[MinValueValidator(1), MaxValueValidator(5)],
         help_text="Rating from 1 to 5"
@@ -18,15 +19,40 @@ class Review(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['product', 'created_at'])]
 
     def __str__(self):
-        return f"{self.user.name} - {self.product.title} ({self.rating}/5)"
+        return f"{self.user} - {self.product.title} ({self.rating}/5)"
 
 class ProductLike(models.Model):
     product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='review_likes')
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='likes')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='likes', null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'product'], name='reviews_productlike_unique_user_product'),
+        ]
+
+
+    def __str__(self):
+        return f"{self.user} likes {self.product.title}"
+
+
+class RatingHistogram(models.Model):
+    """Per-product count of reviews at each star rating, kept by reviews.signals."""
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name='rating_histogram'
+    )
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    def as_dict(self):
+        return {str(rating): getattr(self, f'rating_{rating}') for rating in range(1, 6)}
 
     def __str__(self):
-        return f"{self.user.name} likes {self.product.title}"
\ No newline at end of file
+        return f"{self.product_id}: {self.as_dict()}"
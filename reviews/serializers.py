@@ -1,11 +1,14 @@
 from rest_framework import serializers
 from .models import Review, ProductLike
-from orders.models import OrderItem
+from orders.purchases import has_purchased
 
 
 class ReviewUserSerializer(serializers.Serializer):
     id = serializers.IntegerField()
-    name = serializers.CharField()
+    name = serializers.SerializerMethodField()
+
+    def get_name(self, obj):
+        return obj.get_full_name() or obj.username
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -27,13 +30,7 @@ class ReviewCreateSerializer(serializers.ModelSerializer):
         product_id = self.context['product_id']
 
         # Check if user has purchased this product
-        has_purchased = OrderItem.objects.filter(
-            order__user=user,
-            product_id=product_id,
-            order__status__in=['delivered', 'processing', 'shipped']
-        ).exists()
-
-        if not has_purchased:
+        if not has_purchased(user, product_id):
             raise serializers.ValidationError(
                 "You can only review products you have purchased"
             )
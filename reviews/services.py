@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+from products.cache import bump_product_versions
+from products.models import Product
+from .models import ProductLike
+from .stats import adjust_likes_count
+
+
+def liked_cache_key(user_id):
+    return f'likes:user:{user_id}'
+
+
+def liked_product_ids(user):
+    """
+    The set of product ids ``user`` likes, cached per user so any number of
+    serialized products can answer ``is_liked`` without a query each.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    key = liked_cache_key(user.pk)
+    liked = cache.get(key)
+    if liked is None:
+        liked = frozenset(
+            ProductLike.objects.filter(user=user).values_list('product_id', flat=True)
+        )
+        cache.set(key, liked, settings.LIKED_PRODUCTS_CACHE_TIMEOUT)
+    return liked
+
+
+def toggle_like(user, product_id):
+    """
+    Like the product if ``user`` does not like it yet, otherwise unlike it.
+
+    The toggle is one conditional DELETE, followed when nothing was deleted
+    by one INSERT that ignores a concurrent duplicate; ``likes_count`` moves
+    only when a row actually changed. Returns ``(liked, likes_count)``.
+    """
+    meta = ProductLike._meta
+    qn = connection.ops.quote_name
+    table = qn(meta.db_table)
+    user_column = qn(meta.get_field('user').column)
+    product_column = qn(meta.get_field('product').column)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {user_column} = %s AND {product_column} = %s",
+            [user.pk, product_id],
+        )
+        if cursor.rowcount:
+            liked, delta = False, -1
+        else:
+            now = connection.ops.adapt_datetimefield_value(timezone.now())
+            insert = connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)
+            suffix = connection.ops.on_conflict_suffix_sql(
+                [meta.get_field('user'), meta.get_field('product')], OnConflict.IGNORE, None, None,
+            )
+            cursor.execute(
+                f"{insert} {table} ({user_column}, {product_column}, created_at) "
+                f"VALUES (%s, %s, %s) {suffix}",
+                [user.pk, product_id, now],
+            )
+            # A lost race still leaves the product liked
+            liked, delta = True, 1 if cursor.rowcount else 0
+
+        if delta:
+            adjust_likes_count(product_id, delta)
+        likes_count = Product.objects.filter(pk=product_id).values_list('likes_count', flat=True).first()
+
+    cache.delete(liked_cache_key(user.pk))
+    # Raw SQL skips the model signals that normally do this
+    bump_product_versions([product_id])
+    return liked, likes_count
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Review, ProductLike
+from .stats import adjust_review_stats, adjust_likes_count, recompute_product_stats
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        adjust_review_stats(instance.product_id, instance.rating, 1)
+    else:
+        # Rating may have been edited; the old value is unknown here
+        recompute_product_stats([instance.product_id])
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    adjust_review_stats(instance.product_id, instance.rating, -1)
+
+
+@receiver(post_save, sender=ProductLike)
+def like_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_likes_count(instance.product_id, 1)
+
+
+@receiver(post_delete, sender=ProductLike)
+def like_deleted(sender, instance, **kwargs):
+    adjust_likes_count(instance.product_id, -1)
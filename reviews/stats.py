@@ -0,0 +1,92 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from products.models import Product
+from .models import Review, ProductLike, RatingHistogram
+
+
+def shifted(field, delta):
+    # Counters are unsigned; a delete racing a recompute must not go below 0
+    return Greatest(F(field) + delta, 0)
+
+
+def adjust_review_stats(product_id, rating, delta):
+    """Add (delta=1) or remove (delta=-1) one rating from the product aggregates."""
+    Product.objects.filter(pk=product_id).update(
+        rating_sum=shifted('rating_sum', rating * delta),
+        rating_count=shifted('rating_count', delta),
+        updated_at=timezone.now(),
+    )
+    adjust_rating_histogram(product_id, rating, delta)
+
+
+def adjust_rating_histogram(product_id, rating, delta):
+    field = f'rating_{rating}'
+    histogram = RatingHistogram.objects.filter(product_id=product_id)
+    if histogram.update(**{field: shifted(field, delta)}) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            RatingHistogram.objects.create(product_id=product_id, **{field: delta})
+    except IntegrityError:
+        # Created by a concurrent review in the meantime
+        histogram.update(**{field: shifted(field, delta)})
+
+
+def adjust_likes_count(product_id, delta):
+    Product.objects.filter(pk=product_id).update(
+        likes_count=shifted('likes_count', delta),
+        updated_at=timezone.now(),
+    )
+
+
+def recompute_product_stats(product_ids=None):
+    """
+    Rebuild rating/like aggregates from the source tables in a single UPDATE,
+    then the rating histograms. Only products whose aggregates actually
+    change are written (and get a new ``updated_at``). Returns their number.
+    """
+    reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    likes = ProductLike.objects.filter(product=OuterRef('pk')).order_by().values('product')
+
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+
+    updated = products.alias(
+        new_rating_sum=Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), 0),
+        new_rating_count=Coalesce(Subquery(reviews.annotate(total=Count('id')).values('total')), 0),
+        new_likes_count=Coalesce(Subquery(likes.annotate(total=Count('id')).values('total')), 0),
+    ).exclude(
+        rating_sum=F('new_rating_sum'),
+        rating_count=F('new_rating_count'),
+        likes_count=F('new_likes_count'),
+    ).update(
+        rating_sum=F('new_rating_sum'),
+        rating_count=F('new_rating_count'),
+        likes_count=F('new_likes_count'),
+        # Exports and conditional GETs key off updated_at
+        updated_at=timezone.now(),
+    )
+    recompute_rating_histograms(product_ids)
+    return updated
+
+
+def recompute_rating_histograms(product_ids=None):
+    """Rebuild histogram rows from the reviews with one GROUP BY."""
+    histograms = RatingHistogram.objects.all()
+    reviews = Review.objects.order_by()
+    if product_ids is not None:
+        histograms = histograms.filter(product_id__in=product_ids)
+        reviews = reviews.filter(product_id__in=product_ids)
+
+    counts = reviews.values('product').annotate(**{
+        f'rating_{rating}': Count('id', filter=Q(rating=rating)) for rating in range(1, 6)
+    })
+    with transaction.atomic():
+        histograms.delete()
+        RatingHistogram.objects.bulk_create(
+            [RatingHistogram(product_id=row.pop('product'), **row) for row in counts],
+            batch_size=1000,
+        )
@@ -1,3 +1,263 @@
+import os
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from orders.models import Order, OrderItem, PurchasedProduct
+from products.models import Category, Product
+from . import imports
+from .models import ProductLike, Review, RatingHistogram
+from .services import liked_product_ids, toggle_like
+from .stats import recompute_product_stats
 
-# Create your tests here.
+User = get_user_model()
+
+
+class ReviewTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='Phones', slug='phones')
+        self.product = Product.objects.create(title='Phone', description='...', price=10, category=category)
+        self.users = [
+            User.objects.create_user(username=f'u{i}', phone=f'+99890000000{i}', password='secret')
+            for i in range(5)
+        ]
+
+
+class ProductReviewListTests(ReviewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.reviews = [
+            Review.objects.create(product=self.product, user=user, rating=rating, comment='...')
+            for user, rating in zip(self.users, [5, 5, 4, 1, 5])
+        ]
+
+    def test_pages_newest_first_with_histogram(self):
+        url = reverse('product-reviews', args=[self.product.pk])
+        # Product with histogram, one page of reviews with their users
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'limit': 3})
+
+        expected = [r.pk for r in sorted(self.reviews, key=lambda r: (r.created_at, r.pk), reverse=True)]
+        self.assertEqual([review['id'] for review in response.data['data']], expected[:3])
+        self.assertEqual(response.data['data'][0]['user']['name'], 'u4')
+        rating = response.data['meta']['rating']
+        self.assertEqual(rating['histogram'], {'1': 1, '2': 0, '3': 0, '4': 1, '5': 3})
+        self.assertEqual(rating['count'], 5)
+
+        response = self.client.get(response.data['meta']['pagination']['links']['next'])
+        self.assertEqual([review['id'] for review in response.data['data']], expected[3:])
+
+    def test_histogram_follows_edits_and_deletes(self):
+        self.reviews[0].rating = 2
+        self.reviews[0].save()
+        self.reviews[3].delete()
+        histogram = RatingHistogram.objects.get(product=self.product)
+        self.assertEqual(histogram.as_dict(), {'1': 0, '2': 1, '3': 0, '4': 1, '5': 2})
+
+        RatingHistogram.objects.all().delete()
+        recompute_product_stats()
+        self.assertEqual(RatingHistogram.objects.get(product=self.product).as_dict(), histogram.as_dict())
+
+    def test_rating_edit_moves_product_updated_at(self):
+        long_ago = timezone.now() - timedelta(days=30)
+        Product.objects.filter(pk=self.product.pk).update(updated_at=long_ago)
+
+        self.reviews[0].rating = 2
+        self.reviews[0].save()
+        self.product.refresh_from_db()
+        self.assertGreater(self.product.updated_at, long_ago)
+        self.assertEqual(self.product.rating_sum, 17)
+
+    def test_counters_never_go_negative(self):
+        Product.objects.filter(pk=self.product.pk).update(rating_sum=0, rating_count=0)
+        RatingHistogram.objects.filter(product=self.product).update(rating_5=0)
+        # A delete that raced a recompute which already dropped the review
+        self.reviews[0].delete()
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_sum, self.product.rating_count), (0, 0))
+        self.assertEqual(RatingHistogram.objects.get(product=self.product).rating_5, 0)
+
+    def test_unknown_product(self):
+        response = self.client.get(reverse('product-reviews', args=[self.product.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ReviewEligibilityTests(ReviewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[0]
+        self.client.force_authenticate(self.user)
+        self.order = Order.objects.create(user=self.user, shipping_address='Tashkent')
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=1, price=10)
+
+    def post_review(self):
+        return self.client.post(
+            reverse('product-reviews', args=[self.product.pk]), {'rating': 5, 'comment': 'Great'}
+        )
+
+    def test_only_delivered_purchases_count(self):
+        self.order.status = 'shipped'
+        self.order.save()
+        self.assertEqual(self.post_review().status_code, 400)
+
+        self.order.status = 'delivered'
+        self.order.save()
+        self.assertTrue(PurchasedProduct.objects.filter(user=self.user, product=self.product).exists())
+        self.assertEqual(self.post_review().status_code, 201)
+        self.assertEqual(self.post_review().status_code, 400)
+
+    def test_backfill_command(self):
+        Order.objects.filter(pk=self.order.pk).update(status='delivered')
+        call_command('backfill_purchased_products', stdout=StringIO())
+        purchase = PurchasedProduct.objects.get()
+        self.assertEqual((purchase.user, purchase.product), (self.user, self.product))
+
+
+class LikeToggleTests(ReviewTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = self.users[0]
+        self.client.force_authenticate(self.user)
+
+    def test_toggle_moves_counter_and_liked_set(self):
+        self.assertEqual(liked_product_ids(self.user), frozenset())
+
+        self.assertEqual(toggle_like(self.user, self.product.pk), (True, 1))
+        self.assertEqual(liked_product_ids(self.user), {self.product.pk})
+        toggle_like(self.users[1], self.product.pk)
+
+        response = self.client.post(reverse('product-like-toggle', args=[self.product.pk]))
+        self.assertEqual(response.data['data'], {'liked': False, 'likes_count': 1})
+        self.assertEqual(liked_product_ids(self.user), frozenset())
+        self.assertEqual(ProductLike.objects.get().user, self.users[1])
+
+    def test_stale_product_save_keeps_counters(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        toggle_like(self.user, self.product.pk)
+        Review.objects.create(product=self.product, user=self.user, rating=4)
+
+        stale.title = 'Renamed'
+        stale.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.title, 'Renamed')
+        self.assertEqual(
+            (self.product.likes_count, self.product.rating_count, self.product.rating_sum), (1, 1, 4)
+        )
+
+    def test_is_liked_without_a_query_per_product(self):
+        products = [self.product] + [
+            Product.objects.create(title=f'P{i}', description='...', price=10, category=self.product.category)
+            for i in range(3)
+        ]
+        toggle_like(self.user, products[2].pk)
+        liked_product_ids(self.user)
+
+        ids = ','.join(str(product.pk) for product in products)
+        # Products and thumbnails; the liked set comes from the cache
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('product-batch'), {'ids': ids})
+        self.assertEqual([item['is_liked'] for item in response.data['data']], [False, False, True, False])
+
+
+class ImportReviewsTests(ReviewTestCase):
+    def write(self, suffix, content):
+        file = tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False, encoding='utf-8')
+        with file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_jsonl_import(self):
+        Review.objects.create(product=self.product, user=self.users[0], rating=3)
+        rows = [
+            {'product_id': self.product.pk, 'user_id': self.users[0].pk, 'rating': 5},
+            {'product_id': self.product.pk, 'user_id': self.users[1].pk, 'rating': 5,
+             'comment': 'Old', 'created_at': '2020-01-02T03:04:05Z'},
+            {'product_id': self.product.pk, 'user_id': self.users[1].pk, 'rating': 1},
+            {'product_id': self.product.pk, 'user_id': self.users[2].pk, 'rating': 9},
+            {'product_id': self.product.pk + 100, 'user_id': self.users[2].pk, 'rating': 4},
+            {'product_id': self.product.pk, 'user_id': self.users[3].pk, 'rating': 4},
+            {'product_id': self.product.pk, 'user_id': self.users[4].pk, 'rating': 4, 'created_at': 12345},
+        ]
+        path = self.write('.jsonl', '\n'.join(json.dumps(row) for row in rows) + '\nnot json\n')
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_reviews', path, batch_size=2, stdout=stdout, stderr=stderr)
+
+        self.assertEqual(Review.objects.count(), 3)
+        self.assertEqual(Review.objects.get(user=self.users[1]).created_at.year, 2020)
+        self.assertEqual(Review.objects.get(user=self.users[3]).created_at.year, timezone.now().year)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum), (3, 12))
+        self.assertEqual(
+            RatingHistogram.objects.get(product=self.product).as_dict(),
+            {'1': 0, '2': 0, '3': 1, '4': 1, '5': 1},
+        )
+
+        self.assertEqual(stderr.getvalue().splitlines(), [
+            'Line 4: rating must be between 1 and 5',
+            f'Line 5: unknown product {self.product.pk + 100}',
+            'Line 7: created_at must be an ISO 8601 datetime',
+            'Line 8: not a JSON object',
+        ])
+        output = stdout.getvalue().splitlines()
+        # One progress line per batch of two, with the throughput
+        self.assertEqual(len(output), 5)
+        self.assertRegex(output[3], r'^Read 8 rows: 2 imported, 2 duplicates, 4 invalid \(\d+ rows/s\)$')
+        self.assertIn('Imported 2 reviews for 1 products', output[4])
+
+    def test_import_moves_updated_at_of_changed_products_only(self):
+        other = Product.objects.create(title='Case', description='...', price=1, category=self.product.category)
+        long_ago = timezone.now() - timedelta(days=30)
+        Product.objects.update(updated_at=long_ago)
+
+        rows = [(1, {'product_id': self.product.pk, 'user_id': self.users[0].pk, 'rating': 5})]
+        imports.import_reviews(rows)
+
+        self.product.refresh_from_db()
+        other.refresh_from_db()
+        self.assertGreater(self.product.updated_at, long_ago)
+        self.assertEqual(other.updated_at, long_ago)
+        # Nothing drifted, so a full rebuild writes no rows
+        self.assertEqual(recompute_product_stats(), 0)
+
+    def test_failed_batch_still_recomputes_stats(self):
+        rows = [
+            (number, {'product_id': self.product.pk, 'user_id': user.pk, 'rating': 5})
+            for number, user in enumerate(self.users[:4], start=1)
+        ]
+        real_import_batch = imports.import_batch
+        calls = []
+
+        def import_batch(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise IntegrityError('concurrent review')
+            real_import_batch(*args)
+
+        with mock.patch.object(imports, 'import_batch', import_batch), self.assertRaises(IntegrityError):
+            imports.import_reviews(rows, batch_size=2)
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_sum), (2, 10))
+        self.assertEqual(RatingHistogram.objects.get(product=self.product).rating_5, 2)
+
+    def test_csv_import(self):
+        path = self.write('.csv', 'product_id,user_id,rating,comment\n' + ''.join(
+            f'{self.product.pk},{user.pk},4,"Nice, really"\n' for user in self.users
+        ))
+        call_command('import_reviews', path, stdout=StringIO())
+        self.assertEqual(Review.objects.filter(comment='Nice, really').count(), 5)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.average_rating, 4)
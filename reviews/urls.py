@@ -1,9 +1,9 @@
 from django.urls import path
-from .views import ProductReviewCreateView, ProductLikeToggleView
+from .views import ProductReviewListCreateView, ProductLikeToggleView
 
 urlpatterns = [
 
-    path('products/<int:id>/reviews/', ProductReviewCreateView.as_view(), name='product-review-create'),
+    path('products/<int:id>/reviews/', ProductReviewListCreateView.as_view(), name='product-reviews'),
 
 
     path('products/<int:id>/like-toggle/', ProductLikeToggleView.as_view(), name='product-like-toggle'),
@@ -1,15 +1,45 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from django.shortcuts import get_object_or_404
+from config.pagination import KeysetPagination
 from products.models import Product
-from .models import Review, ProductLike
-from .serializers import ReviewCreateSerializer, ReviewSerializer, ProductLikeSerializer
+from .models import Review, RatingHistogram
+from .serializers import ReviewCreateSerializer, ReviewSerializer
+from .services import toggle_like
 
 
-class ProductReviewCreateView(generics.CreateAPIView):
-    permission_classes = [IsAuthenticated]
-    serializer_class = ReviewCreateSerializer
+class ProductReviewListCreateView(generics.ListCreateAPIView):
+    """
+    ``GET`` pages through a product's reviews newest first, with the rating
+    summary and 1-5 star histogram in ``meta.rating``; ``POST`` adds one.
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return Review.objects.filter(product_id=self.kwargs['id']).select_related('user')
+
+    def get_serializer_class(self):
+        if self.request.method == 'POST':
+            return ReviewCreateSerializer
+        return ReviewSerializer
+
+    def list(self, request, *args, **kwargs):
+        product = get_object_or_404(
+            Product.objects.select_related('rating_histogram'), id=self.kwargs['id']
+        )
+        response = super().list(request, *args, **kwargs)
+        try:
+            histogram = product.rating_histogram.as_dict()
+        except RatingHistogram.DoesNotExist:
+            histogram = RatingHistogram().as_dict()
+        response.data['meta']['rating'] = {
+            'average': product.average_rating,
+            'count': product.reviews_count,
+            'histogram': histogram,
+        }
+        return response
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -34,26 +64,13 @@ class ProductLikeToggleView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
-        product = get_object_or_404(Product, id=self.kwargs['id'])
-        user = request.user
-
-        like_obj, created = ProductLike.objects.get_or_create(
-            user=user,
-            product=product
-        )
-
-        if not created:
-            # Unlike - remove the like
-            like_obj.delete()
-            liked = False
-        else:
-            # Like - already created above
-            liked = True
+        product = get_object_or_404(Product.objects.only('id'), id=self.kwargs['id'])
+        liked, likes_count = toggle_like(request.user, product.pk)
 
         return Response({
             'success': True,
             'data': {
                 'liked': liked,
-                'likes_count': product.likes.count()
+                'likes_count': likes_count
             }
-        })
\ No newline at end of file
+        })